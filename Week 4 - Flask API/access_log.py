@@ -0,0 +1,89 @@
+# access_log.py
+"""
+Non-blocking request logging: QueueHandler on the request path, one
+QueueListener thread doing the actual file I/O (and rotation).
+Why: request threads only enqueue a record; opening/writing/rotating files
+happens off the hot path.
+
+Access records are JSON lines:
+    {"ts": ..., "method": "GET", "path": "/weather/Seattle", "status": 200,
+     "duration_ms": 12.3, "cache_hit": true}
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Any, Dict, Optional
+
+access_logger = logging.getLogger("week4.access")
+
+_listener: Optional[QueueListener] = None
+
+
+def _rotating_handler(path: str, rotation: str, max_bytes: int, backups: int, when: str) -> logging.Handler:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if rotation == "time":
+        return TimedRotatingFileHandler(path, when=when, backupCount=backups, encoding="utf-8", utc=True)
+    return RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+
+
+def setup_async_logging(app, access_log_path: str, app_log_path: str) -> QueueListener:
+    """
+    Route app.logger and the access logger through one queue + listener thread.
+    Rotation comes from config: ACCESS_LOG_ROTATION = "size" | "time".
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    cfg = app.config
+    rotation = cfg.get("ACCESS_LOG_ROTATION", "size")
+
+    app_handler = RotatingFileHandler(app_log_path, maxBytes=1_000_000, backupCount=3, encoding="utf-8")
+    app_handler.setLevel(logging.INFO)
+    app_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+    app_handler.addFilter(lambda r: r.name != access_logger.name)
+
+    access_handler = _rotating_handler(
+        access_log_path,
+        rotation,
+        max_bytes=cfg.get("ACCESS_LOG_MAX_BYTES", 5_000_000),
+        backups=cfg.get("ACCESS_LOG_BACKUPS", 5),
+        when=cfg.get("ACCESS_LOG_WHEN", "midnight"),
+    )
+    access_handler.setFormatter(logging.Formatter("%(message)s"))
+    access_handler.addFilter(lambda r: r.name == access_logger.name)
+
+    q: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    queue_handler = QueueHandler(q)
+
+    app.logger.addHandler(queue_handler)
+    app.logger.setLevel(logging.INFO)
+
+    access_logger.addHandler(queue_handler)
+    access_logger.setLevel(logging.INFO)
+    access_logger.propagate = False
+
+    _listener = QueueListener(q, app_handler, access_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # drains the queue on shutdown
+    return _listener
+
+
+def log_access(method: str, path: str, status: int, duration_ms: float, cache_hit: Optional[bool], **extra: Any) -> None:
+    """Enqueue one structured access record (no file I/O on the caller's thread)."""
+    record: Dict[str, Any] = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "method": method,
+        "path": path,
+        "status": status,
+        "duration_ms": round(duration_ms, 3),
+        "cache_hit": cache_hit,
+        **extra,
+    }
+    access_logger.info(json.dumps(record, separators=(",", ":")))
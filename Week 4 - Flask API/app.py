@@ -8,24 +8,26 @@
 #     * /weather/<city>?units=metric|imperial|standard
 #     * /weather?cities=Seattle,Tokyo,Paris&units=...
 #   with caching + CSV logging
-# - Request logging (rotating file + simple access log)
+# - Request logging (rotating file + JSON access log, written off-thread)
+# - History routes served from an in-memory, tail-following log index
 
 from __future__ import annotations
-import csv
 import os
 import time
-import logging
+import threading
+import atexit
+import itertools
+import importlib.util
 import requests
 import json, urllib.parse
 
 from typing import Tuple, Optional, Dict, Any, List
 from datetime import datetime, timezone
-from logging.handlers import RotatingFileHandler
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 
 
-from flask import Flask, request, jsonify, url_for, redirect
+from flask import Flask, Response, request, jsonify, url_for, redirect, g, stream_with_context
 from werkzeug.exceptions import BadRequest
 from dotenv import load_dotenv
 # app.py (top-level after app = Flask(...))
@@ -44,49 +46,124 @@ load_dotenv(dotenv_path=Path(__file__).with_name(".env"))
 # External config.py must define class Config with:
 #   VERSION, DEBUG, APP_NAME, JSON_SORT_KEYS, OPENWEATHER_KEY
 from config import Config
+from log_index import get_index
+from city_offsets import get_offsets
+from daily_rollups import get_rollups
+from log_writer import WeatherLogWriter, get_writer
+from access_log import log_access, setup_async_logging
+from weather_cache import SingleFlight, SQLiteTTLCache, TTLCache
+from http_utils import make_session, pool_stats
+from bulk_engine import BulkFetchEngine, TokenBucket
+from unit_convert import CANONICAL_UNITS, UNITS, convert_temp, to_units
+from city_aliases import CityAliasMap, has_country_suffix, upstream_params
+from history_stream import MIMETYPES, RunningSummary, stream_history
+from history_pages import DEFAULT_PAGE, read_page
+from conditional_get import conditional_on_log
+import chart_render
+from chart_render import RenderCache
+from downsample import downsample_records
+from json_provider import install_json_provider
+from compression import init_compression
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Registry
+from server_timing import current_timings, init_server_timing, span
+from profiling import init_profiling
 
 app = Flask(__name__)
 app.config.from_object(Config)
+# orjson for jsonify (if installed); gzip/br for large text bodies
+if app.config.get("FAST_JSON", True) and not install_json_provider(app):
+    app.logger.warning("FAST_JSON=1 but orjson is not installed; using the stdlib JSON encoder")
+if app.config.get("COMPRESS_RESPONSES", True):
+    init_compression(app, min_size=app.config.get("COMPRESS_MIN_BYTES", 1024),
+                     level=app.config.get("COMPRESS_LEVEL", 6))
+# Server-Timing: cache / upstream / read / agg / json / total per response
+init_server_timing(app, enabled=app.config.get("SERVER_TIMING", True))
+# ?profile=1 / ?profile=sample: PROFILING_ENABLED and/or PROFILE_ADMIN_TOKEN (then X-Admin-Token is required)
+init_profiling(
+    app,
+    enabled=app.config.get("PROFILING_ENABLED", False),
+    token=app.config.get("PROFILE_ADMIN_TOKEN"),
+    out_dir=app.config.get("PROFILE_DIR", "data/profiles"),
+    sample_ms=app.config.get("PROFILE_SAMPLE_MS", 1.0),
+)
 from flask_cors import CORS
 CORS(app)
 start_time = time.time()
 
 # ---------------------------------------------------------------------
-# Logging (rotating file + simple access log)
+# Logging (rotating file + JSON access log via a queue listener thread)
 # ---------------------------------------------------------------------
 
 os.makedirs("logs", exist_ok=True)
-log_handler = RotatingFileHandler("logs/app.log", maxBytes=1_000_000, backupCount=3)
-log_handler.setLevel(logging.INFO)
-log_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-
-app.logger.addHandler(log_handler)
-app.logger.setLevel(logging.INFO)
-
 os.makedirs("data", exist_ok=True)
 ACCESS_LOG_PATH = "data/access.log"
+WEATHER_LOG_PATH = "data/weather_log.csv"
+
+# request threads only enqueue records; file writes + rotation happen off-thread
+setup_async_logging(app, access_log_path=ACCESS_LOG_PATH, app_log_path="logs/app.log")
 
 
 @app.before_request
 def _log_request() -> None:
+    g.req_start = time.perf_counter()
     app.logger.info(f"{request.method} {request.path}")
 
 
+# ---------------------------------------------------------------------
+# Metrics (GET /metrics, Prometheus text format)
+# ---------------------------------------------------------------------
+
+metrics = Registry()
+REQUEST_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "Request latency by route template, method and status",
+    ("route", "method", "status"))
+UPSTREAM_LATENCY = metrics.histogram(
+    "openweather_request_duration_seconds", "ow_get_weather latency by resulting status", ("status",))
+UPSTREAM_ERRORS = metrics.counter(
+    "openweather_errors_total", "ow_get_weather calls that did not return 200 (502 = network error)",
+    ("status",))
+HISTORY_READ_LATENCY = metrics.histogram(
+    "history_read_duration_seconds", "read_weather_log time by history backend", ("backend",))
+metrics.callback(
+    "weather_cache_requests_total", "Weather cache lookups by result",
+    lambda: {(k,): _weather_cache.stats()[field]
+             for k, field in (("hit", "hits"), ("stale_hit", "stale_hits"), ("miss", "misses"))},
+    kind="counter", labels=("result",))
+metrics.callback("weather_cache_evictions_total", "LRU evictions",
+                 lambda: _weather_cache.stats()["evictions"], kind="counter")
+metrics.callback("weather_cache_expirations_total", "Entries dropped after their TTL",
+                 lambda: _weather_cache.stats()["expirations"], kind="counter")
+metrics.callback("weather_cache_entries", "Entries currently cached", lambda: len(_weather_cache))
+metrics.callback("upstream_coalesced_total", "Cache misses that shared another request's upstream call",
+                 lambda: _weather_flights.stats()["collapsed"], kind="counter")
+metrics.callback("bulk_fetch_in_flight", "Bulk /weather upstream fetches running or queued",
+                 lambda: _bulk_engine.in_flight)
+metrics.callback("log_writer_queue_depth", "Rows waiting for the background CSV writer",
+                 lambda: weather_log_writer().stats()["queue_depth"])
+
+
 @app.after_request
 def _log_after(response):
-    ts = datetime.now(timezone.utc).isoformat()
-    with open(ACCESS_LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(f"{ts} | {request.method} {request.path} {response.status_code}\n")
+    duration_ms = (time.perf_counter() - g.get("req_start", time.perf_counter())) * 1000
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"  # templates keep label cardinality bounded
+    REQUEST_LATENCY.observe(duration_ms / 1000, route, request.method, str(response.status_code))
+    timings = current_timings() if app.config.get("SERVER_TIMING_LOG", False) else None
+    log_access(request.method, request.path, response.status_code, duration_ms, g.get("cache_hit"),
+               **({"timings": timings} if timings else {}))
     return response
 
 
 # ---------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------
-def make_chart(data, city, units="metric"):
-    """Build a QuickChart URL to visualize temperature trends."""
-    temps = [r["temp"] for r in data if r["temp"] is not None]
-    labels = [r["ts"].split("T")[0] if r.get("ts") else "" for r in data]
+def make_chart(data, city, units="metric", points=None):
+    """
+    Build a QuickChart URL to visualize temperature trends.
+    - points: budget for the series; longer histories are downsampled (LTTB)
+    """
+    rows = downsample_records(data, points) if points else [r for r in data if r["temp"] is not None]
+    temps = [r["temp"] for r in rows]
+    labels = [r["ts"].split("T")[0] if r.get("ts") else "" for r in rows]
 
     chart_cfg = {
         "type": "line",
@@ -106,32 +183,112 @@ def make_chart(data, city, units="metric"):
     cfg_json = json.dumps(chart_cfg, separators=(",", ":"))
     return "https://quickchart.io/chart?c=" + urllib.parse.quote_plus(cfg_json)
 
-def read_weather_log(path: str = "data/weather_log.csv", city: str | None = None, limit: int | None = None):
+def chart_limit() -> int:
+    """?limit= for the chart routes: how many recent rows to plot (default 7)."""
+    try:
+        limit = int(request.args.get("limit", 7))
+    except ValueError:
+        raise BadRequest("Query param 'limit' must be an integer")
+    if limit < 1:
+        raise BadRequest("Query param 'limit' must be at least 1")
+    return limit
+
+
+def chart_points() -> int:
+    """?points= budget for chart series (default CHART_MAX_POINTS, at least 3)."""
+    val = request.args.get("points")
+    if val is None:
+        return app.config.get("CHART_MAX_POINTS", 200)
+    try:
+        return max(3, int(val))
+    except ValueError:
+        raise BadRequest("Query param 'points' must be an integer")
+
+
+def read_weather_log(path: str = WEATHER_LOG_PATH, city: str | None = None, limit: int | None = None):
     """
     Read weather_log.csv and return a list of dicts.
     - city: optional filter (case-insensitive)
     - limit: if provided, return only the most recent N rows
+    Served from the process-wide log index; only newly appended bytes are parsed.
+    Until that index is loaded, city reads seek via the per-city offset sidecar.
+    With HISTORY_BACKEND=columnar, rows come from the memory-mapped column store.
+    """
+    started = time.perf_counter()
+    with span("read"):
+        try:
+            if _columnar_enabled():
+                return _columnar(path).select(city=city, limit=limit)
+            index = get_index(path)
+            if city and not index.loaded:
+                offsets = get_offsets(path)
+                if offsets.exists():
+                    return offsets.read_city(city, limit=limit)
+            index.refresh()
+            # chronological order (oldest→newest), same as the file
+            return index.select(city=city, limit=limit)
+        finally:
+            HISTORY_READ_LATENCY.observe(time.perf_counter() - started, app.config.get("HISTORY_BACKEND", "csv"))
+
+
+def iter_weather_log(path: str = WEATHER_LOG_PATH, city: str | None = None, limit: int | None = None):
+    """Same rows as read_weather_log(), yielded one by one (limit=0 means all)."""
+    if _columnar_enabled():
+        return _columnar(path).iter_select(city=city, limit=limit)
+    index = get_index(path)
+    index.refresh()
+    return index.iter_select(city=city, limit=limit)
+
+
+def _columnar_enabled() -> bool:
+    return app.config.get("HISTORY_BACKEND", "csv") == "columnar"
+
+
+# 304 Not Modified until the log changes (ETag = log version + route + query string)
+log_conditional = conditional_on_log(
+    lambda: WEATHER_LOG_PATH,
+    lambda: app.config.get("HISTORY_BACKEND", "csv"),
+)
+
+
+# numpy powers the column store: HISTORY_BACKEND=columnar and /history/query
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+def _columnar(path: str = WEATHER_LOG_PATH):
+    # numpy is only needed for the column store, so import it on first use
+    from columnar_log import get_columnar
+    return get_columnar(path)
+
+
+def _history_aggregates(path: str = WEATHER_LOG_PATH):
+    """Store answering stats()/daily(): column store or daily rollups."""
+    return _columnar(path) if _columnar_enabled() else get_rollups(path)
+
+
+def _warm_log_index() -> None:
     """
-    if not os.path.exists(path):
-        return []
-    rows = []
-    with open(path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if city and row.get("city", "").lower() != city.lower():
-                continue
-            rows.append({
-                "ts": row.get("ts"),
-                "city": row.get("city"),
-                "units": row.get("units"),
-                "temp": float(row["temp"]) if row.get("temp") not in (None, "", "None") else None,
-                "humidity": float(row["humidity"]) if row.get("humidity") not in (None, "", "None") else None,
-                "description": row.get("description"),
-            })
-    # keep chronological order; DictReader preserves file order (oldest→newest)
-    if limit:
-        rows = rows[-int(limit):]
-    return rows
+    Parse the history log once at startup so the first request is cheap.
+    The offset sidecar (city reads, cursor pages) comes first: it is persistent,
+    so after a restart it only catches up and cold city reads are served early.
+    The daily rollups (/history/daily, /history/stats on this backend) follow.
+    The column store is built on the columnar backend, or with HISTORY_QUERY_PRELOAD
+    for /history/query; on the csv backend it is otherwise left to the first query.
+    """
+    try:
+        if not _columnar_enabled():
+            get_offsets(WEATHER_LOG_PATH).refresh()
+            get_index(WEATHER_LOG_PATH).refresh()
+            get_rollups(WEATHER_LOG_PATH).refresh()
+        if HAS_NUMPY and (_columnar_enabled() or app.config.get("HISTORY_QUERY_PRELOAD", False)):
+            _columnar(WEATHER_LOG_PATH).snapshot()
+    except Exception:
+        app.logger.exception("Failed to warm weather log index")
+
+
+# parse in the background; city reads use the offset sidecar meanwhile
+if app.config.get("LOG_INDEX_PRELOAD", True):
+    threading.Thread(target=_warm_log_index, name="log-index-warm", daemon=True).start()
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -148,27 +305,45 @@ def require_float(name: str) -> float:
         raise BadRequest(f"Query param '{name}' must be a number")
 
 
-# --- Tiny in-memory cache for weather (5 min TTL) ---
-CACHE_TTL = 300  # seconds
-# key: (city_lower, units) -> (expiry_ts, data_dict)
-_weather_cache: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+# --- Bounded in-memory cache for weather (LRU + TTL, default 5 min) ---
+CACHE_TTL = app.config.get("CACHE_TTL", 300)  # seconds
+# stale-while-revalidate: serve expired entries for up to CACHE_MAX_STALE more seconds
+CACHE_SWR = app.config.get("CACHE_STALE_WHILE_REVALIDATE", False)
+CACHE_MAX_STALE = app.config.get("CACHE_MAX_STALE", 600) if CACHE_SWR else 0
+# key: (canonical city, "metric") -> data_dict; one canonical payload per city,
+# other unit systems are converted on read (see unit_convert.py)
+# CACHE_BACKEND=sqlite shares one on-disk cache between workers and restarts
+if app.config.get("CACHE_BACKEND", "memory") == "sqlite":
+    _weather_cache = SQLiteTTLCache(
+        app.config.get("CACHE_SQLITE_PATH", "data/weather_cache.sqlite"),
+        maxsize=app.config.get("CACHE_MAX_ENTRIES", 1024), ttl=CACHE_TTL, stale_ttl=CACHE_MAX_STALE,
+    )
+else:
+    _weather_cache = TTLCache(
+        maxsize=app.config.get("CACHE_MAX_ENTRIES", 1024), ttl=CACHE_TTL, stale_ttl=CACHE_MAX_STALE
+    )
+
+
+# "NYC", "New York, US", "new york " ... -> one key, learned from OpenWeather's answers
+_city_aliases = CityAliasMap(app.config.get("CITY_ALIASES_PATH", "data/city_aliases.json"))
+atexit.register(_city_aliases.save)
+
+
+def _cache_key(city: str) -> Tuple[str, str]:
+    return (_city_aliases.resolve(city), CANONICAL_UNITS)
 
 
 def cache_get(city: str, units: str) -> Optional[Dict[str, Any]]:
-    key = (city.lower(), units)
-    entry = _weather_cache.get(key)
-    if not entry:
-        return None
-    expiry, data = entry
-    if time.time() > expiry:
-        _weather_cache.pop(key, None)
-        return None
-    return data
+    data = _weather_cache.get(_cache_key(city))
+    return to_units(data, units) if data else None
 
 
 def cache_set(city: str, units: str, data: Dict[str, Any]) -> None:
-    key = (city.lower(), units)
-    _weather_cache[key] = (time.time() + CACHE_TTL, data)
+    _weather_cache.set(_cache_key(city), to_units(data, CANONICAL_UNITS))
+
+
+# concurrent misses for the same city share one upstream call
+_weather_flights = SingleFlight()
 
 
 # ---------------------------------------------------------------------
@@ -211,6 +386,11 @@ def health():
     return jsonify(status="ok", uptime=f"{uptime}s", version=app.config["VERSION"])
 
 
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+
 @app.route("/meta")
 def meta():
     return jsonify(
@@ -221,6 +401,14 @@ def meta():
         server_time=utc_now_iso(),
         has_weather_key=bool(app.config.get("OPENWEATHER_KEY")),
         cache_entries=len(_weather_cache),
+        cache=_weather_cache.stats(),
+        upstream_coalescing=_weather_flights.stats(),
+        city_aliases=_city_aliases.stats(),
+        http_pool=pool_stats(_http),
+        bulk_engine=_bulk_engine.stats(),
+        upstream_rate_limit=_ow_bucket.stats() if _ow_bucket else None,
+        log_writer=weather_log_writer().stats(),
+        chart_png_cache=_chart_pngs.stats(),
         docs=[
             {"path": url_for("home"), "desc": "home"},
             {"path": url_for("health"), "desc": "health"},
@@ -280,35 +468,30 @@ def echo_json():
     return jsonify(received=data, message="JSON echo complete")
 
 @app.route("/chart")
+@log_conditional
 def chart():
     city = request.args.get("city")
-    limit = int(request.args.get("limit", 7))
+    limit = chart_limit()
     if not city:
         return jsonify(error="Missing ?city="), 400
 
-    from csv import DictReader
-    path = "data/weather_log.csv"
-    if not os.path.exists(path):
+    if not os.path.exists(WEATHER_LOG_PATH):
         return jsonify(error="No data logged yet"), 404
 
-    records = []
-    with open(path, encoding="utf-8") as f:
-        reader = DictReader(f)
-        for row in reader:
-            if row["city"].lower() == city.lower():
-                records.append(row)
+    records = read_weather_log(city=city)
     if not records:
         return jsonify(error=f"No records found for {city}"), 404
 
     # sort chronologically
-    records = sorted(records, key=lambda r: r["ts"])[-limit:]
-    url = make_chart(records, city)
-    return jsonify(chart_url=url, count=len(records))
+    records = sorted(records, key=lambda r: r["ts"] or "")[-limit:]
+    points = chart_points()
+    url = make_chart(records, city, points=points)
+    return jsonify(chart_url=url, count=len(records), points=min(points, len(records)))
 
 @app.route("/chart/view")
 def chart_view():
     city = request.args.get("city")
-    limit = int(request.args.get("limit", 7))
+    limit = chart_limit()
     if not city:
         return jsonify(error="Missing ?city="), 400
 
@@ -316,13 +499,13 @@ def chart_view():
     if not records:
         return jsonify(error=f"No records found for {city}"), 404
 
-    url = make_chart(records, city)
+    url = make_chart(records, city, points=chart_points())
     return redirect(url, code=302)
 
 @app.route("/chart/html")
 def chart_html():
     city = request.args.get("city")
-    limit = int(request.args.get("limit", 7))
+    limit = chart_limit()
     if not city:
         return "<p>Missing ?city=</p>", 400
 
@@ -330,7 +513,7 @@ def chart_html():
     if not records:
         return f"<p>No records for {city}</p>", 404
 
-    url = make_chart(records, city)
+    url = make_chart(records, city, points=chart_points())
     return f"""<!doctype html>
 <meta charset="utf-8">
 <title>{city} Weather Chart</title>
@@ -339,7 +522,41 @@ def chart_html():
 <p><a href="{url}" target="_blank">Open image</a></p>"""
 
 
+# rendered PNGs keyed by (city, limit, units, points, latest ts); the writer hook drops a city's on append
+_chart_pngs = RenderCache(app.config.get("CHART_CACHE_ENTRIES", 128))
+
+
+@app.route("/chart/png")
+@log_conditional
+def chart_png():
+    city = request.args.get("city")
+    limit = chart_limit()
+    units = request.args.get("units", "metric").lower()
+    if not city:
+        return jsonify(error="Missing ?city="), 400
+    if units not in UNITS:
+        return jsonify(error=f"units must be one of {', '.join(UNITS)}"), 400
+    points = chart_points()
+    if not chart_render.available():
+        return jsonify(error="Server-side charts need matplotlib (pip install matplotlib)"), 501
+
+    records = read_weather_log(city=city, limit=limit)
+    if not records:
+        return jsonify(error=f"No records found for {city}"), 404
+
+    key = (city.lower(), limit, units, points, records[-1]["ts"])
+    png = _chart_pngs.get(key)
+    g.cache_hit = png is not None
+    if png is None:
+        series = [{**r, "temp": convert_temp(r["temp"], r["units"] or CANONICAL_UNITS, units)}
+                  for r in downsample_records(records, points)]
+        png = chart_render.render_temperature_png(series, city, units)
+        _chart_pngs.set(key, png)
+    return Response(png, mimetype="image/png")
+
+
 @app.route("/summary")
+@log_conditional
 def summary():
     city = request.args.get("city")
     if not city:
@@ -349,105 +566,157 @@ def summary():
     if not records:
         return jsonify(error=f"No records for {city}"), 404
 
-    temps = [r["temp"] for r in records if r["temp"] is not None]
-    avg = round(sum(temps) / len(temps), 1)
-    latest = records[-1]["temp"]
-    trend = "up" if latest > avg else "down"
+    with span("agg"):
+        temps = [r["temp"] for r in records if r["temp"] is not None]
+        avg = round(sum(temps) / len(temps), 1)
+        latest = records[-1]["temp"]
+        trend = "up" if latest > avg else "down"
 
     summary_text = f"{city} avg {avg}°C — latest {latest}°C ({trend})"
     return jsonify(summary=summary_text)
 
 @app.route("/history")
+@log_conditional
 def history():
     city = request.args.get("city")
-    limit = request.args.get("limit", 10)
+    after = request.args.get("after")
+    limit = request.args.get("limit", 10 if after is None else DEFAULT_PAGE)
+    fmt = request.args.get("format", "json").lower()
     try:
         limit = int(limit)
     except ValueError:
         return jsonify(error="limit must be an integer"), 400
 
+    if after is not None:
+        # cursor pages: seek to the cursor's byte offset, read `limit` rows
+        try:
+            page = read_page(WEATHER_LOG_PATH, after, limit=limit, city=city)
+        except ValueError as e:
+            raise BadRequest(str(e))
+        return jsonify({"city": city or "All", **page})
+    if fmt != "json" and fmt not in MIMETYPES:
+        return jsonify(error="format must be json, ndjson or csv"), 400
+
+    if fmt in MIMETYPES:
+        # streamed: rows are encoded as they are read, summary comes last
+        rows = iter_weather_log(city=city, limit=limit)
+        first = next(rows, None)
+        if first is None:
+            return jsonify(message="No records found", city=city), 404
+        body = stream_history(itertools.chain([first], rows), fmt, city=city)
+        return Response(stream_with_context(body), mimetype=MIMETYPES[fmt])
+
     records = read_weather_log(city=city, limit=limit)
     if not records:
         return jsonify(message="No records found", city=city), 404
 
-    temps = [r["temp"] for r in records if r["temp"] is not None]
-    hums  = [r["humidity"] for r in records if r["humidity"] is not None]
-
-    summary = {
-        "city": city or "All",
-        "count": len(records),
-        "avg_temp": round(sum(temps) / len(temps), 2) if temps else None,
-        "min_temp": min(temps) if temps else None,
-        "max_temp": max(temps) if temps else None,
-        "avg_humidity": round(sum(hums) / len(hums), 2) if hums else None,
+    summary = RunningSummary(city)
+    with span("agg"):
+        for r in records:
+            summary.add(r)
+    return jsonify({
+        **summary.as_dict(),
         "records": records,  # last N, chronological
-    }
-    return jsonify(summary)
+    })
 
 @app.route("/history/stats")
+@log_conditional
 def history_stats():
     city = request.args.get("city")
-    records = read_weather_log(city=city)  # all rows for city, no limit
-    if not records:
+    # answered from the daily rollups (O(days)) or vectorized over the column store
+    with span("agg"):
+        stats = _history_aggregates(WEATHER_LOG_PATH).stats(city)
+    if not stats:
         return jsonify(message="No records found", city=city), 404
-
-    temps = [r["temp"] for r in records if r["temp"] is not None]
-    hums  = [r["humidity"] for r in records if r["humidity"] is not None]
-    out = {
-        "city": city or "All",
-        "samples": len(records),
-        "avg_temp": round(sum(temps) / len(temps), 2) if temps else None,
-        "min_temp": min(temps) if temps else None,
-        "max_temp": max(temps) if temps else None,
-        "avg_humidity": round(sum(hums) / len(hums), 2) if hums else None,
-    }
-    return jsonify(out)
-
-from collections import defaultdict
-
-def group_daily(records):
-    buckets = defaultdict(list)
-    for r in records:
-        day = (r["ts"] or "").split("T")[0]
-        if day:
-            buckets[day].append(r)
-    daily = []
-    for day, rows in sorted(buckets.items()):
-        temps = [x["temp"] for x in rows if x["temp"] is not None]
-        hums  = [x["humidity"] for x in rows if x["humidity"] is not None]
-        daily.append({
-            "date": day,
-            "count": len(rows),
-            "avg_temp": round(sum(temps)/len(temps), 2) if temps else None,
-            "min_temp": min(temps) if temps else None,
-            "max_temp": max(temps) if temps else None,
-            "avg_humidity": round(sum(hums)/len(hums), 2) if hums else None,
-        })
-    return daily
+    return jsonify({"city": city or "All", **stats})
 
 @app.route("/history/daily")
+@log_conditional
 def history_daily():
     city = request.args.get("city")
     limit_days = int(request.args.get("limit", 7))  # last N days
-    records = read_weather_log(city=city)  # all rows for city
-    if not records:
+    with span("agg"):
+        daily = _history_aggregates(WEATHER_LOG_PATH).daily(city)
+    if daily is None:
         return jsonify(message="No records found", city=city), 404
-    daily = group_daily(records)
     return jsonify({
         "city": city or "All",
         "days": daily[-limit_days:]  # last N days
     })
 
+@app.route("/history/query")
+@log_conditional
+def history_query():
+    """
+    Vectorized group-by over the whole history (column store, numpy), e.g.
+    /history/query?group_by=city,day&metrics=temp,humidity&aggs=mean,p95&start=2025-10-01
+    Always served from the column store; on the csv backend the first query builds
+    it (unless HISTORY_QUERY_PRELOAD did at startup), then writer flushes keep it current.
+    """
+    if not HAS_NUMPY:
+        return jsonify(error="/history/query needs numpy (pip install numpy)"), 501
+    from history_query import run_query
+    args = request.args
+    try:
+        with span("read"):
+            cols = _columnar(WEATHER_LOG_PATH).snapshot()
+        with span("agg"):
+            result = run_query(
+                cols,
+                group_by=args.get("group_by"),
+                metrics=args.get("metrics"),
+                aggs=args.get("aggs"),
+                start=args.get("start"),
+                end=args.get("end"),
+                city=args.get("city"),
+            )
+    except ValueError as e:
+        raise BadRequest(str(e))
+    return jsonify(result)
+
 # ---------------------------------------------------------------------
 # Day 3 – OpenWeather integration
 # ---------------------------------------------------------------------
 
+# bulk fan-out: global cap on concurrent upstream calls
+BULK_CONCURRENCY = app.config.get("BULK_CONCURRENCY", 128)
+_bulk_engine = BulkFetchEngine(concurrency=BULK_CONCURRENCY)
+
+# one token bucket for the OpenWeather key, drawn from by every upstream call
+# (single, bulk and background refreshes); rate <= 0 disables it
+_OW_RATE = app.config.get("OPENWEATHER_RATE_PER_SEC", 20)
+_ow_bucket = TokenBucket(_OW_RATE, app.config.get("OPENWEATHER_BURST", 200)) if _OW_RATE > 0 else None
+
+# one long-lived, retrying session for every OpenWeather call; the pool is
+# sized to the bulk concurrency so parallel fetches reuse warm connections
+_http = make_session(
+    total=app.config.get("HTTP_RETRIES", 2),
+    backoff=app.config.get("HTTP_BACKOFF", 0.5),
+    pool_maxsize=BULK_CONCURRENCY,
+    max_retry_after=app.config.get("HTTP_MAX_RETRY_AFTER", 2.0),
+)
+
+
 def ow_get_weather(city: str, units: str, api_key: str) -> Tuple[Optional[Dict[str, Any]], int, Optional[Dict[str, Any]]]:
-    """Call OpenWeather and normalize the payload we return."""
-    base = "https://api.openweathermap.org/data/2.5/weather"
-    params = {"q": city, "appid": api_key, "units": units}
+    """ow request, paced by the key's token bucket, timed and counted for /metrics and Server-Timing."""
+    if _ow_bucket:
+        with span("rate_limit"):
+            _ow_bucket.wait()
+    started = time.perf_counter()
+    with span("upstream"):
+        result, status, err = _ow_request(city, units, api_key)
+    UPSTREAM_LATENCY.observe(time.perf_counter() - started, str(status))
+    if status != 200:
+        UPSTREAM_ERRORS.inc(str(status))
+    return result, status, err
+
+
+def _ow_request(city: str, units: str, api_key: str) -> Tuple[Optional[Dict[str, Any]], int, Optional[Dict[str, Any]]]:
+    """Call OpenWeather and normalize the payload we return (`city` may be an 'id:<n>' alias key)."""
+    base = app.config.get("OPENWEATHER_URL", "https://api.openweathermap.org/data/2.5/weather")
+    params = {**upstream_params(city), "appid": api_key, "units": units}
     try:
-        r = requests.get(base, params=params, timeout=10)
+        r = _http.get(base, params=params, timeout=10)
     except requests.exceptions.RequestException as ex:
         # Prefer a clear 502 for upstream/network issues
         return None, 502, {"message": "Upstream request failed", "detail": str(ex)}
@@ -467,34 +736,123 @@ def ow_get_weather(city: str, units: str, api_key: str) -> Tuple[Optional[Dict[s
         "humidity": data.get("main", {}).get("humidity"),
         "description": (data.get("weather") or [{}])[0].get("description"),
         "wind_speed": data.get("wind", {}).get("speed"),
+        "city_id": data.get("id"),
+        "country": data.get("sys", {}).get("country"),
         "ts": utc_now_iso(),
     }
     return result, 200, None
 
 
-def append_weather_log(row: Dict[str, Any], path: str = "data/weather_log.csv") -> None:
-    """Append a single-row CSV line (created on first write)."""
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    is_new = not os.path.exists(path)
-    with open(path, "a", encoding="utf-8") as f:
-        if is_new:
-            f.write("ts,city,units,temp,humidity,description,wind_speed\n")
-        # simple CSV (avoid commas in description)
-        f.write(",".join([
-            str(row.get("ts", "")),
-            str(row.get("city", "")),
-            str(row.get("units", "")),
-            str(row.get("temp", "")),
-            str(row.get("humidity", "")),
-            str(row.get("description", "")).replace(",", " "),
-            str(row.get("wind_speed", "")),
-        ]) + "\n")
+def _update_log_sidecars(path: str, written) -> None:
+    """Writer flush hook: keep the sidecars and column store current, drop stale chart PNGs."""
+    get_offsets(path).note_appended(written)
+    get_rollups(path).note_appended(written)
+    if HAS_NUMPY:
+        _columnar(path).note_appended(written)  # no-op until the preload or a query has built it
+    _chart_pngs.invalidate(row.get("city") for row, _, _ in written)
+
+
+def weather_log_writer(path: str = WEATHER_LOG_PATH) -> WeatherLogWriter:
+    return get_writer(
+        path,
+        batch_rows=app.config.get("LOG_WRITER_BATCH_ROWS", 200),
+        flush_ms=app.config.get("LOG_WRITER_FLUSH_MS", 250),
+        queue_size=app.config.get("LOG_WRITER_QUEUE_SIZE", 10_000),
+        on_flush=_update_log_sidecars,
+    )
+
+
+def append_weather_log(row: Dict[str, Any], path: str = WEATHER_LOG_PATH) -> None:
+    """Queue a row for the background CSV writer (file + header created on first flush)."""
+    weather_log_writer(path).submit(row)
+
+
+def _fetch_and_store(city: str, api_key: str):
+    """
+    Upstream fetch for a cache miss / refresh; runs once per in-flight key.
+    Always fetches the canonical (metric) payload; callers convert.
+    """
+    # a flight that finished just before we joined may have filled the cache
+    # (re-resolve: that flight may also have taught us an alias for this query)
+    resolved = _cache_key(city)
+    fresh = _weather_cache.peek(resolved)
+    if fresh:
+        return fresh, 200, None
+    # ask upstream for what the alias map resolved ("NYC" -> "new york,us" / "id:5128581")
+    data, code, err = ow_get_weather(resolved[0], CANONICAL_UNITS, api_key)
+    if code == 200:
+        # log & cache successful responses (CSV rows are logged in metric)
+        try:
+            append_weather_log(data)
+        except Exception:
+            app.logger.exception("Failed to append weather log")
+        _city_aliases.learn(city, data)
+        cache_set(city, CANONICAL_UNITS, data)
+    return data, code, err
+
+
+# background refreshes for stale-while-revalidate hits
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="weather-refresh")
+
+
+def _refresh_in_background(city: str, api_key: str, key: Tuple[str, str]) -> None:
+    if _weather_flights.in_flight(key):
+        return  # someone is already fetching it
+
+    def run():
+        try:
+            _weather_flights.do(key, lambda: _fetch_and_store(city, api_key))
+        except Exception:
+            app.logger.exception("Background weather refresh failed")
+
+    _refresh_pool.submit(run)
+
+
+WeatherResult = Tuple[Optional[Dict[str, Any]], int, Optional[Dict[str, Any]], bool]
+
+
+def lookup_weather(city: str, units: str, api_key: str) -> Optional[WeatherResult]:
+    """
+    Cache-only half of get_weather(); None on a miss.
+    With stale-while-revalidate on, an expired entry inside CACHE_MAX_STALE is
+    returned right away (flagged "stale": true) and refreshed in the background.
+    """
+    with span("cache"):
+        key = _cache_key(city)
+        if CACHE_SWR:
+            cached, stale = _weather_cache.get_stale(key)
+        else:
+            cached, stale = _weather_cache.get(key), False
+    if cached and stale:
+        _refresh_in_background(city, api_key, key)
+        return {**to_units(cached, units), "stale": True}, 200, None, True
+    if cached:
+        return to_units(cached, units), 200, None, True
+    return None
+
+
+def fetch_weather(city: str, units: str, api_key: str) -> WeatherResult:
+    """
+    Upstream half of get_weather(); concurrent callers for the same city share
+    one call, whatever units they asked for.
+    """
+    key = _cache_key(city)
+    (data, code, err), _shared = _weather_flights.do(key, lambda: _fetch_and_store(city, api_key))
+    return (to_units(data, units) if data else None), code, err, False
+
+
+def get_weather(city: str, units: str, api_key: str) -> WeatherResult:
+    """
+    Cache-first lookup shared by the single and bulk routes.
+    Returns (data, code, err, cache_hit).
+    """
+    return lookup_weather(city, units, api_key) or fetch_weather(city, units, api_key)
 
 
 @app.route("/weather/<city>")
 def weather_single(city: str):
-    # nudge to bulk if commas are used in path
-    if "," in city:
+    # nudge to bulk if commas are used in path ("Paris, FR" country suffixes are fine)
+    if "," in city and not has_country_suffix(city):
         return jsonify(
             error="Use bulk endpoint for multiple cities",
             example="/weather?cities=Seattle,New%20York,Paris"
@@ -510,23 +868,12 @@ def weather_single(city: str):
 
     city = city.strip()
 
-    # cache-first
-    cached = cache_get(city, units)
-    if cached:
-        return jsonify({**cached, "cache": True})
-
-    data, code, err = ow_get_weather(city, units, api_key)
+    # cache-first (misses are coalesced per city/units)
+    data, code, err, hit = get_weather(city, units, api_key)
+    g.cache_hit = hit
     if code != 200:
         return jsonify(source="openweather", error=err), code
-
-    # log & cache successful responses
-    try:
-        append_weather_log(data)
-    except Exception:
-        app.logger.exception("Failed to append weather log")
-
-    cache_set(city, units, data)
-    return jsonify({**data, "cache": False})
+    return jsonify({**data, "cache": hit})
 
 
 @app.route("/weather")
@@ -551,33 +898,22 @@ def weather_bulk():
     results: List[Dict[str, Any]] = []
     errors: List[Dict[str, Any]] = []
 
-    def fetch_one(city_name: str) -> Dict[str, Any]:
-        # cache-first
-        cached = cache_get(city_name, units)
-        if cached:
-            return {"data": {**cached, "cache": True}, "city": city_name, "code": 200, "err": None}
-
-        data, code, err = ow_get_weather(city_name, units, api_key)
+    # all cities at once: cache hits inline, misses on the engine's shared
+    # (globally bounded) executor, each paced by the key's token bucket
+    with span("fanout"):  # upstream calls on executor threads aren't timed separately
+        outcomes = _bulk_engine.run(
+            cities,
+            lookup=lambda c: lookup_weather(c, units, api_key),
+            fetch=lambda c: fetch_weather(c, units, api_key),
+        )
+    for city_name, (data, code, err, hit) in zip(cities, outcomes):
         if code == 200:
-            try:
-                append_weather_log(data)
-            except Exception:
-                app.logger.exception("Failed to append weather log (bulk)")
-            cache_set(city_name, units, data)
-            return {"data": {**data, "cache": False}, "city": city_name, "code": code, "err": None}
-
-        return {"data": None, "city": city_name, "code": code, "err": err}
-
-    # modest concurrency to respect upstream rate limits
-    with ThreadPoolExecutor(max_workers=min(6, len(cities))) as ex:
-        futures = [ex.submit(fetch_one, c) for c in cities]
-        for fut in as_completed(futures):
-            res = fut.result()
-            if res["code"] == 200:
-                results.append(res["data"])
-            else:
-                errors.append({"city": res["city"], "code": res["code"], "error": res["err"]})
+            results.append({**data, "cache": hit})
+        else:
+            errors.append({"city": city_name, "code": code, "error": err})
 
+    # access log: a bulk call is a "hit" only if every city came from cache
+    g.cache_hit = bool(results) and not errors and all(r["cache"] for r in results)
     return jsonify({"units": units, "count": len(results), "results": results, "errors": errors})
 
 
@@ -0,0 +1,174 @@
+# bench/fake_openweather.py
+"""
+Local stand-in for OpenWeather's /data/2.5/weather, for load tests.
+Why: benchmarks against the real API measure our network and the key's quota,
+not the app — and burn that quota. This answers deterministically per city
+with configurable latency, 5xx error rate and 429 rate limiting.
+
+    python bench/fake_openweather.py --port 8081 --latency-ms 80 --jitter-ms 20 \\
+        --error-rate 0.01 --rate-limit 60
+    OPENWEATHER_URL=http://127.0.0.1:8081/data/2.5/weather python app.py
+
+--rate-limit is requests/second across all clients (token bucket, burst = 1 s
+worth); over it the server answers 429 with Retry-After: 1.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+DESCRIPTIONS = ("clear sky", "few clouds", "broken clouds", "light rain", "mist", "snow")
+# abbreviations the real API answers 404 for (see city_aliases.SEED_ALIASES)
+UNKNOWN = frozenset({"nyc", "la", "sf"})
+
+
+def fake_payload(query: str, units: str) -> Dict[str, Any]:
+    """Stable per city: the same query always gets the same id/temperature."""
+    name, _, country = query.partition(",")
+    name = name.strip().title() or "Nowhere"
+    seed = zlib.crc32(name.lower().encode())
+    temp_c = (seed % 400) / 10 - 5  # -5.0 .. 34.9 °C
+    temp = {"imperial": temp_c * 9 / 5 + 32, "standard": temp_c + 273.15}.get(units, temp_c)
+    wind = (seed % 150) / 10
+    return {
+        "id": seed % 10_000_000,
+        "name": name,
+        "sys": {"country": (country.strip() or "XX").upper()[:2]},
+        "main": {"temp": round(temp, 2), "humidity": 30 + seed % 70},
+        "weather": [{"description": DESCRIPTIONS[seed % len(DESCRIPTIONS)]}],
+        "wind": {"speed": round(wind * 2.2369362920544 if units == "imperial" else wind, 2)},
+    }
+
+
+class FakeOpenWeather:
+    def __init__(self, latency_ms: float = 50, jitter_ms: float = 0, error_rate: float = 0.0,
+                 rate_limit: float = 0, seed: Optional[int] = None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = rate_limit
+        self._updated = time.monotonic()
+        self.counts = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0}
+        self.queries: List[str] = []  # q=/id= values answered, in order ("id:5128581")
+        self._ids: Dict[str, str] = {}  # ids handed out -> the q that produced them
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    def _take_token(self) -> bool:
+        if self.rate_limit <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._updated) * self.rate_limit)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counts["requests"] += 1
+            self.counts[key] += 1
+
+    def handle(self, path: str):
+        """(status, headers, body) for one GET."""
+        url = urlparse(path)
+        if url.path != "/data/2.5/weather":
+            return 404, {}, {"cod": "404", "message": "not found"}
+        if not self._take_token():
+            self._count("rate_limited")
+            return 429, {"Retry-After": "1"}, {"cod": 429, "message": "rate limit exceeded (fake)"}
+        with self._lock:
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.error_rate
+        time.sleep(delay)
+        if fail:
+            self._count("errors")
+            return 500, {}, {"cod": 500, "message": "internal error (fake)"}
+        qs = parse_qs(url.query)
+        units = qs.get("units", ["standard"])[0]
+        with self._lock:
+            if "id" in qs:
+                self.queries.append(f"id:{qs['id'][0]}")
+                query = self._ids.get(qs["id"][0])
+            else:
+                query = qs.get("q", [""])[0]
+                self.queries.append(query)
+        if query is None or query.partition(",")[0].strip().lower() in UNKNOWN:
+            self._count("errors")
+            return 404, {}, {"cod": "404", "message": "city not found"}
+        payload = fake_payload(query, units)
+        with self._lock:
+            self._ids[str(payload["id"])] = query
+        self._count("ok")
+        return 200, {}, payload
+
+    # ---- server -------------------------------------------------------
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve on a background thread; returns the weather endpoint URL."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def do_GET(self):
+                status, headers, payload = fake.handle(self.path)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 1024  # the default 5 drops bursts of connects into SYN retries
+
+        self._httpd = Server((host, port), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, name="fake-openweather", daemon=True).start()
+        return f"http://{host}:{self._httpd.server_port}/data/2.5/weather"
+
+    def stop(self) -> None:
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Fake OpenWeather current-weather API")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8081)
+    p.add_argument("--latency-ms", type=float, default=50)
+    p.add_argument("--jitter-ms", type=float, default=0)
+    p.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 500")
+    p.add_argument("--rate-limit", type=float, default=0, help="requests/second before 429s (0 = off)")
+    args = p.parse_args()
+
+    fake = FakeOpenWeather(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit)
+    url = fake.start(args.host, args.port)
+    print(f"Fake OpenWeather on {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
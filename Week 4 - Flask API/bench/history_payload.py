@@ -0,0 +1,98 @@
+# bench/history_payload.py
+"""
+Serialization time and bytes-on-wire for a 10k-record /history response.
+Compares Flask's stdlib JSON provider with the orjson provider, and identity
+vs gzip vs brotli (if installed) encodings, on a synthetic log in a temp dir.
+
+Usage (from the Week 4 folder):
+    python bench/history_payload.py [--records 10000] [--repeat 20] [--json results.json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+HEADER = "ts,city,units,temp,humidity,description,wind_speed\n"
+CITIES = ("Seattle", "Tokyo", "London", "Paris", "New York")
+
+
+def write_log(path: str, n: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for i in range(n):
+            f.write(f"2025-10-{1 + i // 1440 % 28:02d}T{i // 60 % 24:02d}:{i % 60:02d}:00+00:00,"
+                    f"{CITIES[i % len(CITIES)]},metric,{10 + (i * 7) % 150 / 10},{40 + i % 50},"
+                    f"broken clouds,{(i % 90) / 10}\n")
+
+
+def timed(fn, repeat: int) -> float:
+    """Median milliseconds over `repeat` runs."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    p.add_argument("--records", type=int, default=10_000)
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--json", help="also write the results to this file")
+    args = p.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="week4-bench-")
+    os.chdir(workdir)
+    os.makedirs("data", exist_ok=True)
+    write_log("data/weather_log.csv", args.records)
+
+    from flask.json.provider import DefaultJSONProvider
+    from app import app
+    import compression
+    from json_provider import OrjsonProvider, orjson
+
+    client = app.test_client()
+    url = f"/history?limit={args.records}"
+    payload = client.get(url).get_json()  # also warms the log index
+    providers = {"stdlib": DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers["orjson"] = OrjsonProvider(app)
+
+    results = {"records": args.records, "serialize_ms": {}, "request_ms": {}, "bytes": {}}
+    with app.test_request_context():
+        for name, provider in providers.items():
+            results["serialize_ms"][name] = timed(lambda: provider.response(payload), args.repeat)
+            body = provider.response(payload).get_data()
+            for enc in ("identity", *compression._encodings()):
+                data = body if enc == "identity" else compression.compress_bytes(body, enc)
+                results["bytes"][f"{name}/{enc}"] = len(data)
+
+    original = app.json
+    for name, provider in providers.items():
+        app.json = provider
+        for enc in ("identity", *compression._encodings()):
+            headers = {"Accept-Encoding": enc}
+            results["request_ms"][f"{name}/{enc}"] = timed(lambda: client.get(url, headers=headers), args.repeat)
+    app.json = original
+
+    print(f"/history with {args.records} records (median of {args.repeat})")
+    for name, ms in results["serialize_ms"].items():
+        print(f"  serialize  {name:<8} {ms:>9.3f} ms")
+    for key, ms in results["request_ms"].items():
+        print(f"  request    {key:<16} {ms:>9.3f} ms  {results['bytes'][key]:>10,} bytes")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# bench/loadgen.py
+"""
+Concurrent load test of the weather and history routes against a fake OpenWeather.
+Why: per-feature micro-benchmarks don't show how the cache, bulk engine, log
+writer and history reads behave together under concurrency — and the real API
+can't be hammered. Results are saved as JSON so two commits can be compared.
+
+Usage (from the Week 4 folder):
+    python bench/loadgen.py [--duration 10] [--concurrency 16] [--scenarios weather,bulk,history,daily]
+        [--latency-ms 50] [--error-rate 0.01] [--rate-limit 0] [--records 20000]
+        [--target http://127.0.0.1:5000] [--out bench/results]
+    python bench/loadgen.py --compare bench/results/A.json bench/results/B.json
+
+Without --target it starts the fake OpenWeather and the app (werkzeug, threaded)
+in-process on a seeded log in a temp dir. With --target it only drives load; start
+that server with OPENWEATHER_URL pointing at bench/fake_openweather.py.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from fake_openweather import FakeOpenWeather  # noqa: E402
+from history_payload import CITIES, write_log  # noqa: E402
+
+WORLD = [f"City{i:03d}" for i in range(200)]  # /weather cities beyond the seeded log
+
+
+def scenarios(city_pool: int, bulk_size: int) -> Dict[str, Callable[[random.Random], str]]:
+    """name -> function picking the next request path."""
+    pool = WORLD[:city_pool]
+    return {
+        "weather": lambda rng: f"/weather/{rng.choice(pool)}?units=metric",
+        "bulk": lambda rng: "/weather?units=metric&cities=" + ",".join(rng.sample(pool, min(bulk_size, len(pool)))),
+        "history": lambda rng: f"/history?city={rng.choice(CITIES)}&limit=200",
+        "daily": lambda rng: f"/history/daily?city={rng.choice(CITIES)}",
+    }
+
+
+def percentile(sorted_ms: List[float], q: float) -> Optional[float]:
+    if not sorted_ms:
+        return None
+    k = min(len(sorted_ms) - 1, max(0, round(q / 100 * (len(sorted_ms) - 1))))
+    return round(sorted_ms[k], 3)
+
+
+def run_scenario(base: str, pick: Callable[[random.Random], str], concurrency: int,
+                 duration: float, seed: int) -> Dict[str, object]:
+    """Closed loop: `concurrency` workers, each sending back-to-back for `duration` s."""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(n: int) -> None:
+        rng = random.Random(seed + n)
+        session = requests.Session()
+        mine, codes = [], {}
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                code = str(session.get(base + pick(rng), timeout=30).status_code)
+            except requests.exceptions.RequestException:
+                code = "error"
+            mine.append((time.perf_counter() - t0) * 1000)
+            codes[code] = codes.get(code, 0) + 1
+        with lock:
+            latencies.extend(mine)
+            for k, v in codes.items():
+                statuses[k] = statuses.get(k, 0) + v
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ok = sum(v for k, v in statuses.items() if k.startswith("2"))
+    return {
+        "requests": len(latencies),
+        "ok": ok,
+        "errors": len(latencies) - ok,
+        "statuses": dict(sorted(statuses.items())),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": round(latencies[-1], 3) if latencies else None,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_local(args) -> tuple:
+    """Fake OpenWeather + the app on ephemeral ports, in a temp dir with a seeded log."""
+    fake = FakeOpenWeather(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit, seed=args.seed)
+    os.environ["OPENWEATHER_URL"] = fake.start()
+    os.environ["OPENWEATHER_API_KEY"] = "bench"
+
+    workdir = tempfile.mkdtemp(prefix="week4-load-")
+    os.chdir(workdir)
+    os.makedirs("data", exist_ok=True)
+    write_log("data/weather_log.csv", args.records)
+
+    from werkzeug.serving import make_server
+    from app import app
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    app.logger.setLevel(logging.WARNING)  # per-request INFO lines would swamp the report
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-app", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", fake, server
+
+
+def compare(a_path: str, b_path: str) -> None:
+    with open(a_path, encoding="utf-8") as f:
+        a = json.load(f)
+    with open(b_path, encoding="utf-8") as f:
+        b = json.load(f)
+    print(f"{'scenario':<10} {'metric':<8} {a.get('commit') or 'A':>12} {b.get('commit') or 'B':>12} {'change':>9}")
+    for name, before in a["results"].items():
+        after = b["results"].get(name)
+        if not after:
+            continue
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            x, y = before.get(metric), after.get(metric)
+            change = f"{(y - x) / x * 100:+.1f}%" if x and y is not None else "n/a"
+            print(f"{name:<10} {metric:<8} {x!s:>12} {y!s:>12} {change:>9}")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    p.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--scenarios", default="weather,bulk,history,daily")
+    p.add_argument("--city-pool", type=int, default=50, help="distinct /weather cities (cache hit ratio)")
+    p.add_argument("--bulk-size", type=int, default=10)
+    p.add_argument("--records", type=int, default=20_000, help="rows in the seeded history log")
+    p.add_argument("--latency-ms", type=float, default=50)
+    p.add_argument("--jitter-ms", type=float, default=10)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--rate-limit", type=float, default=0, help="fake upstream requests/second (0 = off)")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--target", help="drive an already-running app instead of starting one")
+    p.add_argument("--out", default=os.path.join(HERE, "results"), help="directory for the JSON report")
+    p.add_argument("--compare", nargs=2, metavar=("A", "B"), help="diff two saved reports and exit")
+    args = p.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    commit = git_commit()
+    out_dir = os.path.abspath(args.out)
+    fake = server = None
+    if args.target:
+        base = args.target.rstrip("/")
+    else:
+        base, fake, server = start_local(args)
+
+    picks = scenarios(args.city_pool, args.bulk_size)
+    results = {}
+    for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+        if name not in picks:
+            sys.exit(f"unknown scenario {name!r} (choose from {', '.join(picks)})")
+        results[name] = run_scenario(base, picks[name], args.concurrency, args.duration, args.seed)
+        r = results[name]
+        print(f"{name:<8} {r['requests']:>7} req {r['rps']:>8} rps  p50 {r['p50_ms']} ms  "
+              f"p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms  errors {r['errors']}")
+
+    if server:
+        server.shutdown()
+    if fake:
+        fake.stop()
+
+    report = {
+        "commit": commit,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "upstream": fake.counts if fake else None,
+        "results": results,
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{time.strftime('%Y%m%dT%H%M%S')}-{commit or 'nogit'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"saved {path}")
+
+
+if __name__ == "__main__":
+    main()
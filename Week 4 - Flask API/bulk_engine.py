@@ -0,0 +1,109 @@
+# bulk_engine.py
+"""
+Fan-out engine for GET /weather?cities=...
+Why: the old ThreadPoolExecutor(max_workers=6) turned 200 cities into ~34
+sequential waves of upstream latency. Here cache hits are answered inline and
+every miss is submitted at once to a process-wide executor whose size is the
+global concurrency limit, so a cold request costs ceil(misses / concurrency)
+round trips.
+
+Pacing for the OpenWeather key is not done here: TokenBucket.wait() is called
+inside ow_get_weather, so single, bulk and background-refresh calls all draw
+from the same bucket. Once a burst is spent, misses queue on that bucket, so a
+cold bulk request with more misses than OPENWEATHER_BURST takes roughly
+(misses - burst) / OPENWEATHER_RATE_PER_SEC seconds extra.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, bursts of up to `capacity`.
+    Thread-safe: reserve() takes a token under a plain lock and says how long
+    to wait before using it; wait() does that sleep on the calling thread.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.waited = 0  # acquisitions that had to sleep
+        self.waited_seconds = 0.0
+
+    def reserve(self) -> float:
+        """Take one token; return how long to wait before using it."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            delay = -self._tokens / self.rate
+            self.waited += 1
+            self.waited_seconds += delay
+            return delay
+
+    def wait(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_sec": self.rate,
+            "burst": self.capacity,
+            "rate_limited_waits": self.waited,
+            "rate_limited_seconds": round(self.waited_seconds, 3),
+        }
+
+
+class BulkFetchEngine:
+    def __init__(self, concurrency: int = 128):
+        self.concurrency = max(1, int(concurrency))
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bulk-fetch")
+        self._lock = threading.Lock()
+        self.in_flight = 0  # upstream fetches currently running or queued on the executor
+
+    def run(
+        self,
+        items: Sequence[T],
+        lookup: Callable[[T], Optional[R]],
+        fetch: Callable[[T], R],
+    ) -> List[R]:
+        """
+        Resolve every item; results come back in input order.
+        lookup(item) is a cheap, non-blocking check (e.g. the cache) -> result or None.
+        fetch(item) is the blocking upstream call, run on the shared executor.
+        """
+        results: List[Any] = [lookup(item) for item in items]
+        misses = [i for i, hit in enumerate(results) if hit is None]
+        self._add_in_flight(len(misses))
+        futures = [(i, self._executor.submit(self._fetch_one, fetch, items[i])) for i in misses]
+        for i, future in futures:
+            results[i] = future.result()
+        return results
+
+    def _fetch_one(self, fetch: Callable[[T], R], item: T) -> R:
+        try:
+            return fetch(item)
+        finally:
+            self._add_in_flight(-1)
+
+    def _add_in_flight(self, n: int) -> None:
+        with self._lock:
+            self.in_flight += n
+
+    def stats(self) -> Dict[str, Any]:
+        return {"concurrency": self.concurrency, "in_flight": self.in_flight}
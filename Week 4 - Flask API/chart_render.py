@@ -0,0 +1,117 @@
+# chart_render.py
+"""
+Server-side PNG charts for GET /chart/png, plus a cache of rendered images.
+Why: /chart/view and /chart/html depend on a QuickChart round trip with the
+whole series in the query string. Here matplotlib (same library as
+week2/chart_weather.py) renders locally on the Agg backend, through the
+object-oriented Figure API so concurrent requests don't share pyplot state.
+
+Rendering costs tens of ms, so PNGs are cached under
+(city, limit, units, points, latest ts). A new row changes the latest ts, so old
+images can never be served again; the writer hook drops a city's entries as
+soon as rows for it are appended.
+
+matplotlib is optional: without it, available() is False and the route answers 501.
+"""
+from __future__ import annotations
+
+import io
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+try:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.dates as mdates
+    from matplotlib.figure import Figure
+except ImportError:  # optional dependency
+    Figure = None
+
+UNIT_LABEL = {"metric": "°C", "imperial": "°F", "standard": "K"}
+
+
+def available() -> bool:
+    return Figure is not None
+
+
+def _parse_ts(ts: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(ts) if ts else None
+    except ValueError:
+        return None
+
+
+def render_temperature_png(records: List[Dict[str, Any]], city: str, units: str = "metric") -> bytes:
+    """Line chart of temp over time for rows already expressed in `units`."""
+    points = [(_parse_ts(r.get("ts")), r.get("temp")) for r in records]
+    points = [(dt, t) for dt, t in points if dt is not None and t is not None]
+
+    fig = Figure(figsize=(9, 5))
+    ax = fig.subplots()
+    if points:
+        dates, temps = zip(*points)
+        if len(dates) == 1:
+            ax.scatter(dates, temps)
+        else:
+            ax.plot(dates, temps, marker="o", linewidth=2)
+    ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+    ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
+    fig.autofmt_xdate()
+    ax.set_title(f"Weather History for {city}")
+    ax.set_xlabel("Date")
+    ax.set_ylabel(f"Temp ({UNIT_LABEL.get(units, units)})")
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100)
+    return buf.getvalue()
+
+
+class RenderCache:
+    """LRU of rendered images keyed by tuples whose first item is the (lowercased) city."""
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = max(1, int(maxsize))
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            png = self._data.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def set(self, key: Hashable, png: bytes) -> None:
+        with self._lock:
+            self._data[key] = png
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, cities: Iterable[str]) -> None:
+        """Drop every image for these cities (called when rows for them are appended)."""
+        cities = {c.lower() for c in cities if c}
+        with self._lock:
+            stale = [k for k in self._data if k[0] in cities]
+            for k in stale:
+                del self._data[k]
+            self.invalidations += len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._data),
+            "max_entries": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
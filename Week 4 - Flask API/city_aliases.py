@@ -0,0 +1,171 @@
+# city_aliases.py
+"""
+City-name canonicalization for cache keys.
+Why: "New York", "new york ", "New York, US" and "NYC" used to be four cache
+keys and four upstream calls. Queries are normalized (case, whitespace,
+punctuation, country or US-state suffix), then resolved through an alias map
+that learns from OpenWeather's answers (returned city id/name/country) and is
+persisted to data/city_aliases.json so every worker and restart benefits.
+The resolved key is also what goes upstream (upstream_params), so "NYC" is
+fetched as q=new york,us — or id=5128581 once that id has been learned.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+_PUNCT = re.compile(r"[^\w\s,]+")
+_SPACES = re.compile(r"\s+")
+_CODE = re.compile(r"^[a-z]{2}$")
+
+# OpenWeather takes "city,state,US" for US states only
+US_STATES = frozenset(
+    "al ak az ar ca co ct de dc fl ga hi id il in ia ks ky la me md ma mi mn ms mo mt ne nv "
+    "nh nj nm ny nc nd oh ok or pa ri sc sd tn tx ut vt va wa wv wi wy".split()
+)
+# without ",US", a bare state code is read as a state only if it isn't also a
+# country code ("Paris, TX" is Texas; "London, CA" stays Canada)
+_UNAMBIGUOUS_STATES = US_STATES - frozenset(
+    "al ar az ca co de ga id il in ky la ma md me mn mo ms mt nc ne pa sc sd tn va".split()
+)
+
+# a few well-known abbreviations OpenWeather does not resolve on its own;
+# these are sent upstream as the target name and never overwritten by learn()
+SEED_ALIASES = {
+    "nyc": "new york,us",
+    "la": "los angeles,us",
+    "sf": "san francisco,us",
+}
+
+
+def _clean(part: str) -> str:
+    return _SPACES.sub(" ", _PUNCT.sub(" ", part.casefold())).strip()
+
+
+def _suffix(parts: List[str]) -> Optional[List[str]]:
+    """Cleaned location suffix ([country] or [state, "us"]), or None if it isn't one."""
+    codes = [_clean(p) for p in parts]
+    if not all(_CODE.match(c) for c in codes):
+        return None
+    if len(codes) == 1:
+        return [codes[0], "us"] if codes[0] in _UNAMBIGUOUS_STATES else codes
+    if len(codes) == 2 and codes[0] in US_STATES and codes[1] == "us":
+        return codes
+    return None
+
+
+def has_country_suffix(query: str) -> bool:
+    """True for 'City, CC' or 'City, ST[, US]', e.g. 'New York, US' or 'Paris, TX'."""
+    name, *parts = query.split(",")
+    return bool(parts) and bool(name.strip()) and _suffix(parts) is not None
+
+
+def normalize_city(query: str) -> str:
+    """'  St. Louis , US ' -> 'st louis,us'; 'Paris, TX' -> 'paris,tx,us' (name[,state],country)."""
+    name, *parts = query.split(",")
+    name = _clean(name)
+    suffix = _suffix(parts) if parts else []
+    if suffix is None:
+        # not a recognizable suffix: keep only the last part as the country
+        suffix = [_clean(parts[-1])] if _clean(parts[-1]) else []
+    return ",".join([name, *suffix])
+
+
+def upstream_params(key: str) -> Dict[str, str]:
+    """OpenWeather query params for a resolved key: {'id': ...} or {'q': ...}."""
+    return {"id": key[3:]} if key.startswith("id:") else {"q": key}
+
+
+class CityAliasMap:
+    def __init__(self, path: str | None = None, save_interval: float = 5.0):
+        self.path = os.path.abspath(path) if path else None
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._aliases: Dict[str, str] = {}
+        self._dirty = False
+        self._last_save = 0.0
+        self.learned = 0
+        if self.path:
+            self._aliases.update(self._read_file())
+        self._aliases.update(SEED_ALIASES)  # a saved file can't shadow the seeds
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def resolve(self, query: str) -> str:
+        """Canonical cache key for a query (e.g. 'id:5128581', or the normalized name)."""
+        key = normalize_city(query)
+        seen = set()
+        # follow alias chains (nyc -> new york,us -> id:5128581), guarding against cycles
+        while key in self._aliases and key not in seen:
+            seen.add(key)
+            key = self._aliases[key]
+        return key
+
+    def learn(self, query: str, payload: Dict[str, Any]) -> None:
+        """Record what OpenWeather said `query` means."""
+        city_id = payload.get("city_id")
+        name = payload.get("city") or ""
+        country = payload.get("country") or ""
+        if city_id is not None:
+            canonical = f"id:{city_id}"
+        elif name:
+            canonical = normalize_city(f"{name},{country}" if country else name)
+        else:
+            return
+
+        norm = normalize_city(query)
+        keys = {norm}
+        if name and country:
+            keys.add(normalize_city(f"{name},{country}"))
+        if name and "," not in norm:
+            # "london" can be learned from a bare query; "london,ca" must not claim it
+            keys.add(normalize_city(name))
+        keys.discard(canonical)
+        keys -= SEED_ALIASES.keys()  # "LA" must keep meaning Los Angeles
+
+        with self._lock:
+            changed = False
+            for k in keys:
+                if self._aliases.get(k) != canonical:
+                    self._aliases[k] = canonical
+                    changed = True
+            if changed:
+                self.learned += 1
+                self._dirty = True
+        if changed:
+            self.save(force=False)
+
+    # ---- persistence --------------------------------------------------
+
+    def _read_file(self) -> Dict[str, str]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return {str(k): str(v) for k, v in data.items()}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self, force: bool = True) -> None:
+        """Merge with what other workers saved, then write atomically (tmp + rename)."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty or (not force and time.time() - self._last_save < self.save_interval):
+                return
+            merged = {**self._read_file(), **self._aliases, **SEED_ALIASES}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(merged, f, indent=0, sort_keys=True)
+            os.replace(tmp, self.path)
+            self._aliases = merged
+            self._dirty = False
+            self._last_save = time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"aliases": len(self._aliases), "learned": self.learned}
@@ -0,0 +1,226 @@
+# city_offsets.py
+"""
+Persistent per-city byte-offset sidecar for data/weather_log.csv.
+Why: a cold city-filtered read can seek straight to that city's rows
+instead of decoding the whole log (cost ~ rows for that city, not file size).
+
+The sidecar is a small SQLite file next to the log (weather_log.csv.idx.sqlite).
+It remembers how many bytes of the log it covers plus the log's inode, so rows
+appended by other writers are caught up on the next read, and a rotated or
+truncated log triggers a rebuild. Catch-ups and appends run in BEGIN IMMEDIATE
+transactions, so several workers sharing the sidecar never index a row twice.
+The app creates it in the startup preload thread (refresh()), so city reads and
+cursor pages only ever catch up.
+
+CLI:
+    python city_offsets.py build [--log data/weather_log.csv]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+from log_index import parse_row, scan_lines, split_csv_line
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS offsets (
+    city   TEXT    NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS offsets_city ON offsets (city, offset);
+"""
+
+
+def sidecar_path(log_path: str) -> str:
+    return os.path.abspath(log_path) + ".idx.sqlite"
+
+
+class CityOffsetIndex:
+    """city (lowercased) -> byte offsets/lengths of its rows in the CSV log."""
+
+    def __init__(self, log_path: str):
+        self.log_path = os.path.abspath(log_path)
+        self.db_path = sidecar_path(self.log_path)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ---- plumbing -----------------------------------------------------
+
+    def exists(self) -> bool:
+        return os.path.exists(self.db_path)
+
+    def _conn(self) -> sqlite3.Connection:
+        # one connection per thread (sqlite3 connections are not shared across threads);
+        # the schema is applied once, when the thread first opens it
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _meta(conn: sqlite3.Connection) -> Dict[str, str]:
+        return dict(conn.execute("SELECT key, value FROM meta"))
+
+    @staticmethod
+    def _set_meta(conn: sqlite3.Connection, **values: Any) -> None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(k, str(v)) for k, v in values.items()],
+        )
+
+    def _sync(self, conn: sqlite3.Connection, rebuild: bool = False) -> None:
+        """
+        Bring the sidecar up to date with the log (caller holds the lock).
+        Other processes share the file, so the catch-up runs in a BEGIN IMMEDIATE
+        transaction and re-reads meta inside it: whoever gets the write lock
+        second sees the first one's progress instead of inserting the same rows.
+        """
+        if not rebuild and self._current(conn):
+            return  # cheap read-only check; no write lock for the common case
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._catch_up(conn, rebuild)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def _current(self, conn: sqlite3.Connection) -> bool:
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return False
+        meta = self._meta(conn)
+        return meta.get("inode") == str(st.st_ino) and meta.get("size") == str(st.st_size)
+
+    def _catch_up(self, conn: sqlite3.Connection, rebuild: bool = False) -> None:
+        """Scan whatever the sidecar doesn't cover yet (inside a write transaction)."""
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            conn.execute("DELETE FROM offsets")
+            conn.execute("DELETE FROM meta")
+            return
+
+        meta = self._meta(conn)
+        covered = int(meta.get("size", 0))
+        header = meta["header"].split(",") if meta.get("header") else None
+        if rebuild or meta.get("inode") != str(st.st_ino) or st.st_size < covered:
+            conn.execute("DELETE FROM offsets")
+            covered, header = 0, None
+        elif st.st_size == covered:
+            return
+
+        entries: List[Tuple[str, int, int]] = []
+        end, header = scan_lines(
+            self.log_path, covered, header,
+            lambda offset, length, fields: entries.append(((fields.get("city") or "").lower(), offset, length)),
+        )
+        conn.executemany("INSERT INTO offsets (city, offset, length) VALUES (?, ?, ?)", entries)
+        self._set_meta(conn, size=end, inode=st.st_ino, header=",".join(header or []))
+
+    # ---- public API ---------------------------------------------------
+
+    def build(self) -> int:
+        """(Re)create the sidecar from the whole log; returns rows indexed."""
+        with self._lock, self._conn() as conn:
+            self._sync(conn, rebuild=True)
+            return conn.execute("SELECT COUNT(*) FROM offsets").fetchone()[0]
+
+    def refresh(self) -> None:
+        """Create the sidecar if needed and catch up with the log (startup preload)."""
+        with self._lock, self._conn() as conn:
+            self._sync(conn)
+
+    def note_appended(self, written: List[Tuple[Dict[str, Any], int, int]]) -> None:
+        """
+        Record rows just written by the log writer as (row, offset, length).
+        Only maintains an existing sidecar (use the CLI to create one);
+        if someone else appended in between, fall back to a catch-up scan.
+        """
+        if not written or not self.exists():
+            return
+        with self._lock, self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # meta check + inserts + meta update as one unit
+            meta = self._meta(conn)
+            if meta.get("size") == str(written[0][1]) and meta.get("header"):
+                conn.executemany(
+                    "INSERT INTO offsets (city, offset, length) VALUES (?, ?, ?)",
+                    [(str(row.get("city", "")).lower(), offset, length) for row, offset, length in written],
+                )
+                _, offset, length = written[-1]
+                self._set_meta(conn, size=offset + length)
+            else:
+                self._catch_up(conn)
+
+    def read_city(self, city: str, limit: int | None = None) -> List[Dict[str, Any]]:
+        """Seek to one city's rows; oldest→newest, optionally only the last N."""
+        with self._lock, self._conn() as conn:
+            self._sync(conn)
+            header = self._meta(conn).get("header", "").split(",")
+            sql = "SELECT offset, length FROM offsets WHERE city = ? ORDER BY offset DESC"
+            params: Tuple[Any, ...] = (city.lower(),)
+            if limit:
+                sql += " LIMIT ?"
+                params += (int(limit),)
+            spans = conn.execute(sql, params).fetchall()
+        spans.reverse()
+        return list(self._read_spans(spans, header))
+
+    def read_city_after(self, city: str, after: int, limit: int) -> List[Tuple[int, int, Dict[str, Any]]]:
+        """Up to `limit` of one city's rows starting past byte `after`, as (offset, length, row)."""
+        with self._lock, self._conn() as conn:
+            self._sync(conn)
+            header = self._meta(conn).get("header", "").split(",")
+            spans = conn.execute(
+                "SELECT offset, length FROM offsets WHERE city = ? AND offset >= ? ORDER BY offset LIMIT ?",
+                (city.lower(), int(after), int(limit)),
+            ).fetchall()
+        return [(o, n, row) for (o, n), row in zip(spans, self._read_spans(spans, header))]
+
+    def _read_spans(self, spans: Iterable[Tuple[int, int]], header: List[str]):
+        if not spans:
+            return
+        with open(self.log_path, "rb") as f:
+            for offset, length in spans:
+                f.seek(offset)
+                values = split_csv_line(f.read(length))
+                yield parse_row(dict(zip(header, values)))
+
+
+_sidecars: Dict[str, CityOffsetIndex] = {}
+_sidecars_lock = threading.Lock()
+
+
+def get_offsets(log_path: str) -> CityOffsetIndex:
+    """Return the shared sidecar handle for this log path."""
+    key = os.path.abspath(log_path)
+    with _sidecars_lock:
+        idx = _sidecars.get(key)
+        if idx is None:
+            idx = _sidecars[key] = CityOffsetIndex(key)
+    return idx
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Per-city byte-offset sidecar for weather_log.csv")
+    p.add_argument("command", choices=["build"], help="build: (re)create the sidecar from the log")
+    p.add_argument("--log", default="data/weather_log.csv", help="Path to the CSV log")
+    args = p.parse_args()
+
+    if not os.path.exists(args.log):
+        raise SystemExit(f"Missing {args.log}")
+    n = CityOffsetIndex(args.log).build()
+    print(f"Indexed {n} rows → {sidecar_path(args.log)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+# columnar_log.py
+"""
+Columnar, memory-mapped copy of data/weather_log.csv.
+Why: the history routes parsed text and called float() on every value of every
+row per request. Here each column is a flat binary array on disk that numpy
+memory-maps, so aggregations over the full history are vectorized and the OS
+page cache does the rest.
+
+Layout (data/weather_log.cols/):
+    ts.i8                int64 epoch microseconds (MISSING_TS if blank/unparseable)
+    temp.f8, humidity.f8, wind.f8
+                         float64 (NaN if blank)
+    city.i4, units.i4, desc.i4
+                         int32 codes into dicts.json (dictionary encoding)
+    dicts.json           {"city": [...], "units": [...], "desc": [...]}
+    meta.json            rows, CSV bytes covered (+ inode), header
+
+meta.json is rewritten (atomically) after the columns, so its row count is the
+source of truth; bytes past it from an interrupted append are truncated away.
+Timestamps are rendered back as UTC ISO-8601 ("...+00:00").
+
+CLI:
+    python columnar_log.py build   [--log data/weather_log.csv]   # from scratch
+    python columnar_log.py compact [--log data/weather_log.csv]   # catch up, sort by ts, drop unused dict entries
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from log_index import _num, parse_row, scan_lines
+
+MISSING_TS = np.iinfo(np.int64).min
+US_PER_DAY = 86_400_000_000
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+NUMERIC = {"ts": np.int64, "temp": np.float64, "humidity": np.float64, "wind": np.float64}
+CODED = ("city", "units", "desc")
+COLUMNS = {**NUMERIC, **{name: np.int32 for name in CODED}}
+SUFFIX = {np.int64: "i8", np.float64: "f8", np.int32: "i4"}
+
+
+def columns_dir(log_path: str) -> str:
+    root, _ = os.path.splitext(os.path.abspath(log_path))
+    return root + ".cols"
+
+
+def _ts_to_us(ts: Optional[str]) -> int:
+    if not ts:
+        return MISSING_TS
+    try:
+        dt = datetime.fromisoformat(ts)
+    except ValueError:
+        return MISSING_TS
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def _us_to_ts(us: int) -> Optional[str]:
+    if us == MISSING_TS:
+        return None
+    return (EPOCH + timedelta(microseconds=int(us))).isoformat()
+
+
+def _nan(v: Optional[float]) -> float:
+    return np.nan if v is None else v
+
+
+def _opt(v: float) -> Optional[float]:
+    return None if np.isnan(v) else float(v)
+
+
+def _write_json(path: str, data: Any) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class Columns:
+    """A read-only snapshot: memory-mapped arrays + dictionaries."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], dicts: Dict[str, List[str]]):
+        self.arrays = arrays
+        self.dicts = dicts
+        self.rows = len(arrays["ts"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    def city_mask(self, city: str | None) -> Optional[np.ndarray]:
+        """Boolean mask for a case-insensitive city match (None = all rows)."""
+        if not city:
+            return None
+        codes = [i for i, name in enumerate(self.dicts["city"]) if name.lower() == city.lower()]
+        return np.isin(self.arrays["city"], codes)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        a, d = self.arrays, self.dicts
+        return {
+            "ts": _us_to_ts(a["ts"][i]),
+            "city": d["city"][a["city"][i]],
+            "units": d["units"][a["units"][i]],
+            "temp": _opt(a["temp"][i]),
+            "humidity": _opt(a["humidity"][i]),
+            "description": d["desc"][a["desc"][i]],
+        }
+
+
+class ColumnarLog:
+    def __init__(self, log_path: str):
+        self.log_path = os.path.abspath(log_path)
+        self.dir = columns_dir(self.log_path)
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Tuple[int, Columns]] = None  # (meta mtime_ns, columns)
+
+    # ---- files --------------------------------------------------------
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.dir, "meta.json"))
+
+    def _col_path(self, name: str, directory: str | None = None) -> str:
+        return os.path.join(directory or self.dir, f"{name}.{SUFFIX[COLUMNS[name]]}")
+
+    def _read_json(self, name: str, default: Any) -> Any:
+        try:
+            with open(os.path.join(self.dir, name), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    def _meta(self) -> Dict[str, Any]:
+        return self._read_json("meta.json", {})
+
+    def _dicts(self) -> Dict[str, List[str]]:
+        return self._read_json("dicts.json", {name: [] for name in CODED})
+
+    # ---- writing ------------------------------------------------------
+
+    def _encode(self, rows: List[Dict[str, Any]], dicts: Dict[str, List[str]]) -> Dict[str, np.ndarray]:
+        lookup = {name: {v: i for i, v in enumerate(dicts[name])} for name in CODED}
+
+        def code(name: str, value: Optional[str]) -> int:
+            value = value or ""
+            idx = lookup[name].get(value)
+            if idx is None:
+                idx = lookup[name][value] = len(dicts[name])
+                dicts[name].append(value)
+            return idx
+
+        return {
+            "ts": np.array([_ts_to_us(r["ts"]) for r in rows], dtype=np.int64),
+            "temp": np.array([_nan(r["temp"]) for r in rows], dtype=np.float64),
+            "humidity": np.array([_nan(r["humidity"]) for r in rows], dtype=np.float64),
+            "wind": np.array([_nan(r.get("wind_speed")) for r in rows], dtype=np.float64),
+            "city": np.array([code("city", r["city"]) for r in rows], dtype=np.int32),
+            "units": np.array([code("units", r["units"]) for r in rows], dtype=np.int32),
+            "desc": np.array([code("desc", r["description"]) for r in rows], dtype=np.int32),
+        }
+
+    def _append(self, rows: List[Dict[str, Any]], meta: Dict[str, Any], **meta_updates: Any) -> None:
+        """Append parsed rows to every column, then commit meta.json (caller holds the lock)."""
+        os.makedirs(self.dir, exist_ok=True)
+        n = int(meta.get("rows", 0))
+        dicts = self._dicts()
+        arrays = self._encode(rows, dicts) if rows else {}
+        for name, dtype in COLUMNS.items():
+            with open(self._col_path(name), "ab") as f:
+                f.truncate(n * np.dtype(dtype).itemsize)  # drop any half-finished append
+                if rows:
+                    f.write(arrays[name].tobytes())
+        if rows:
+            _write_json(os.path.join(self.dir, "dicts.json"), dicts)
+        _write_json(os.path.join(self.dir, "meta.json"), {**meta, **meta_updates, "rows": n + len(rows)})
+
+    def _sync(self, rebuild: bool = False) -> None:
+        """Fold unseen CSV bytes into the columns (caller holds the lock)."""
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return
+        meta = self._meta()
+        covered = int(meta.get("size", 0))
+        header = meta.get("header")
+        if rebuild or meta.get("inode") != st.st_ino or st.st_size < covered:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            meta, covered, header = {}, 0, None
+        elif st.st_size == covered:
+            return
+
+        rows: List[Dict[str, Any]] = []
+
+        def on_row(offset: int, length: int, fields: Dict[str, str]) -> None:
+            row = parse_row(fields)
+            row["wind_speed"] = _num(fields.get("wind_speed"))
+            rows.append(row)
+
+        end, header = scan_lines(self.log_path, covered, header, on_row)
+        self._append(rows, meta, size=end, inode=st.st_ino, header=header)
+
+    def build(self) -> int:
+        """(Re)create the columns from the whole CSV; returns the row count."""
+        with self._lock:
+            self._sync(rebuild=True)
+            return int(self._meta().get("rows", 0))
+
+    def note_appended(self, written: List[Tuple[Dict[str, Any], int, int]]) -> None:
+        """Append rows just written by the log writer (existing store only)."""
+        if not written or not self.exists():
+            return
+        with self._lock:
+            meta = self._meta()
+            if meta.get("size") == written[0][1] and meta.get("header"):
+                rows = [parse_row({k: str(v) for k, v in row.items()}) for row, _, _ in written]
+                for parsed, (row, _, _) in zip(rows, written):
+                    parsed["wind_speed"] = row.get("wind_speed")
+                _, offset, length = written[-1]
+                self._append(rows, meta, size=offset + length)
+            else:
+                self._sync()
+
+    def compact(self) -> int:
+        """
+        Catch up with the CSV, then rewrite every column in timestamp order with
+        freshly built dictionaries (unused entries dropped). Swapped in atomically.
+        """
+        with self._lock:
+            self._sync()
+            cols = self._load()
+            if cols is None:
+                return 0
+            order = np.argsort(cols["ts"], kind="stable")
+            tmp_dir = self.dir + ".compact"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            dicts: Dict[str, List[str]] = {}
+            for name in COLUMNS:
+                data = np.asarray(cols[name])[order]
+                if name in CODED:
+                    used, data = np.unique(data, return_inverse=True)
+                    dicts[name] = [cols.dicts[name][i] for i in used]
+                    data = data.astype(np.int32)
+                data.tofile(self._col_path(name, tmp_dir))
+            _write_json(os.path.join(tmp_dir, "dicts.json"), dicts)
+            _write_json(os.path.join(tmp_dir, "meta.json"), self._meta())
+            del cols  # release the memory maps before swapping directories
+            self._snapshot = None
+            old_dir = self.dir + ".old"
+            shutil.rmtree(old_dir, ignore_errors=True)
+            os.replace(self.dir, old_dir)
+            os.replace(tmp_dir, self.dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+            return int(self._meta().get("rows", 0))
+
+    # ---- reading ------------------------------------------------------
+
+    def _load(self) -> Optional[Columns]:
+        meta_path = os.path.join(self.dir, "meta.json")
+        try:
+            mtime = os.stat(meta_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if self._snapshot and self._snapshot[0] == mtime:
+            return self._snapshot[1]
+        n = int(self._meta().get("rows", 0))
+        arrays = {
+            name: (np.memmap(self._col_path(name), dtype=dtype, mode="r", shape=(n,))
+                   if n else np.empty(0, dtype=dtype))
+            for name, dtype in COLUMNS.items()
+        }
+        cols = Columns(arrays, self._dicts())
+        self._snapshot = (mtime, cols)
+        return cols
+
+    def snapshot(self) -> Optional[Columns]:
+        """Up-to-date columns (catching up with the CSV first); None if there is no log."""
+        with self._lock:
+            self._sync()
+            return self._load()
+
+    def select(self, city: str | None = None, limit: int | None = None) -> List[Dict[str, Any]]:
+        """Same contract as the log index: rows oldest→newest, optionally one city / last N."""
+        cols = self.snapshot()
+        if cols is None or not cols.rows:
+            return []
+        mask = cols.city_mask(city)
+        idx = np.flatnonzero(mask) if mask is not None else np.arange(cols.rows)
+        if limit:
+            idx = idx[-int(limit):]
+        return [cols.row(i) for i in idx]
+
+    def iter_select(self, city: str | None = None, limit: int | None = None) -> Iterator[Dict[str, Any]]:
+        """Like select(), but decodes one row at a time (for streamed responses)."""
+        cols = self.snapshot()
+        if cols is None or not cols.rows:
+            return
+        mask = cols.city_mask(city)
+        if mask is None:
+            idx = range(max(0, cols.rows - int(limit)) if limit else 0, cols.rows)
+        else:
+            idx = np.flatnonzero(mask)
+            if limit:
+                idx = idx[-int(limit):]
+        for i in idx:
+            yield cols.row(i)
+
+    def stats(self, city: str | None = None) -> Optional[Dict[str, Any]]:
+        """Vectorized equivalent of the rollup stats (None if no samples)."""
+        cols = self.snapshot()
+        if cols is None:
+            return None
+        mask = cols.city_mask(city)
+        temp = cols["temp"] if mask is None else cols["temp"][mask]
+        hum = cols["humidity"] if mask is None else cols["humidity"][mask]
+        if not len(temp):
+            return None
+        has_t, has_h = ~np.isnan(temp), ~np.isnan(hum)
+        return {
+            "samples": int(len(temp)),
+            "avg_temp": round(float(temp[has_t].mean()), 2) if has_t.any() else None,
+            "min_temp": float(temp[has_t].min()) if has_t.any() else None,
+            "max_temp": float(temp[has_t].max()) if has_t.any() else None,
+            "avg_humidity": round(float(hum[has_h].mean()), 2) if has_h.any() else None,
+        }
+
+    def daily(self, city: str | None = None) -> Optional[List[Dict[str, Any]]]:
+        """Vectorized per-day buckets, oldest first (None if no samples)."""
+        cols = self.snapshot()
+        if cols is None:
+            return None
+        mask = cols.city_mask(city)
+        ts = cols["ts"] if mask is None else cols["ts"][mask]
+        if not len(ts):
+            return None
+        temp = cols["temp"] if mask is None else cols["temp"][mask]
+        hum = cols["humidity"] if mask is None else cols["humidity"][mask]
+
+        dated = ts != MISSING_TS  # rows without a timestamp count as samples, not days
+        ts, temp, hum = ts[dated], temp[dated], hum[dated]
+        if not len(ts):
+            return []
+        days, inv = np.unique(ts // US_PER_DAY, return_inverse=True)
+        has_t, has_h = ~np.isnan(temp), ~np.isnan(hum)
+        count = np.bincount(inv, minlength=len(days))
+        t_n = np.bincount(inv, weights=has_t, minlength=len(days))
+        t_sum = np.bincount(inv, weights=np.where(has_t, temp, 0.0), minlength=len(days))
+        h_n = np.bincount(inv, weights=has_h, minlength=len(days))
+        h_sum = np.bincount(inv, weights=np.where(has_h, hum, 0.0), minlength=len(days))
+        t_min = np.full(len(days), np.inf)
+        t_max = np.full(len(days), -np.inf)
+        np.minimum.at(t_min, inv[has_t], temp[has_t])
+        np.maximum.at(t_max, inv[has_t], temp[has_t])
+
+        out = []
+        for i, day in enumerate(days):
+            out.append({
+                "date": (EPOCH + timedelta(days=int(day))).date().isoformat(),
+                "count": int(count[i]),
+                "avg_temp": round(float(t_sum[i] / t_n[i]), 2) if t_n[i] else None,
+                "min_temp": float(t_min[i]) if t_n[i] else None,
+                "max_temp": float(t_max[i]) if t_n[i] else None,
+                "avg_humidity": round(float(h_sum[i] / h_n[i]), 2) if h_n[i] else None,
+            })
+        return out
+
+
+_stores: Dict[str, ColumnarLog] = {}
+_stores_lock = threading.Lock()
+
+
+def get_columnar(log_path: str) -> ColumnarLog:
+    """Return the shared columnar store for this log path."""
+    key = os.path.abspath(log_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = ColumnarLog(key)
+    return store
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Columnar copy of weather_log.csv")
+    p.add_argument("command", choices=["build", "compact"],
+                   help="build: from scratch; compact: catch up + rewrite sorted with clean dictionaries")
+    p.add_argument("--log", default="data/weather_log.csv", help="Path to the CSV log")
+    args = p.parse_args()
+
+    if not os.path.exists(args.log):
+        raise SystemExit(f"Missing {args.log}")
+    store = ColumnarLog(args.log)
+    n = store.build() if args.command == "build" else store.compact()
+    print(f"{args.command}: {n} rows → {store.dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# compression.py
+"""
+Negotiated gzip / brotli response compression (after_request hook).
+Why: /history and bulk /weather bodies are repetitive JSON sent uncompressed;
+gzip typically cuts them 5-10x.
+
+- picks br or gzip from Accept-Encoding (br only if the brotli package is installed)
+- buffered bodies below `min_size` bytes are left alone (not worth the CPU)
+- streamed bodies (?format=ndjson|csv) are compressed chunk by chunk with a
+  sync flush after each, so clients still receive rows as they are produced
+- skips 1xx/204/304, HEAD, already-encoded bodies and non-text types (PNG)
+- ETags get an encoding suffix ("<etag>-gzip"); conditional_get accepts it back
+"""
+from __future__ import annotations
+
+import zlib
+from typing import Iterable, Iterator
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/")
+
+
+def _encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _compressible(response: Response) -> bool:
+    if response.status_code < 200 or response.status_code in (204, 304) or request.method == "HEAD":
+        return False
+    if "Content-Encoding" in response.headers or response.direct_passthrough:
+        return False
+    mimetype = response.mimetype or ""
+    return any(mimetype.startswith(m) for m in COMPRESSIBLE)
+
+
+def _compressor(encoding: str, level: int):
+    if encoding == "br":
+        return brotli.Compressor(quality=min(level, 11))
+    return zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+
+
+def compress_bytes(data: bytes, encoding: str, level: int = 6) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=min(level, 11))
+    c = _compressor(encoding, level)
+    return c.compress(data) + c.flush()
+
+
+def _compress_stream(chunks: Iterable, encoding: str, level: int) -> Iterator[bytes]:
+    c = _compressor(encoding, level)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        if encoding == "br":
+            out = c.process(chunk) + c.flush()
+        else:
+            out = c.compress(chunk) + c.flush(zlib.Z_SYNC_FLUSH)
+        if out:
+            yield out
+    yield c.finish() if encoding == "br" else c.flush()
+
+
+def init_compression(app: Flask, min_size: int = 1024, level: int = 6) -> None:
+    @app.after_request
+    def _compress(response: Response) -> Response:
+        response.vary.add("Accept-Encoding")
+        if not _compressible(response):
+            return response
+        encoding = request.accept_encodings.best_match(_encodings())
+        if not encoding:
+            return response
+
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encoding, level)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            response.set_data(compress_bytes(data, encoding, level))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
@@ -0,0 +1,76 @@
+# conditional_get.py
+"""
+Conditional GET (ETag / Last-Modified → 304) for routes derived from the weather log.
+Why: /history, /summary, /chart ... answer the same thing until a new row is
+appended, yet every dashboard poll recomputed it. The validator is the log's
+version — (inode, size, mtime_ns) from one os.stat, no read — hashed together
+with the route and its query string, so a revalidation costs a stat call.
+
+If-None-Match wins over If-Modified-Since (RFC 9110). Last-Modified has
+one-second resolution, so clients that can should revalidate with the ETag.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from flask import Response, make_response, request
+
+
+def log_version(path: str) -> Optional[Tuple[str, datetime]]:
+    """(version token, last-modified) for the log, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    token = f"{st.st_ino}-{st.st_size}-{st.st_mtime_ns}"
+    return token, datetime.fromtimestamp(int(st.st_mtime), tz=timezone.utc)
+
+
+def _etag(version: str, salt: str) -> str:
+    args = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    digest = hashlib.blake2b(f"{salt}|{version}|{request.path}?{args}".encode(), digest_size=12)
+    return digest.hexdigest()
+
+
+def _matches(etag: str) -> bool:
+    """If-None-Match hit, also for the "<etag>-gzip"/"-br" tags compression hands out."""
+    tags = request.if_none_match
+    return tags.star_tag or any(t.split("-", 1)[0] == etag for t in tags.as_set())
+
+
+def conditional_on_log(path_fn: Callable[[], str], salt_fn: Callable[[], str] = lambda: "") -> Callable:
+    """
+    Decorate a view whose 200 response depends only on the log at path_fn()
+    and the request's path + query string. `salt_fn` adds anything else the
+    output depends on (e.g. the history backend).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            version = log_version(path_fn())
+            if version is None:
+                return view(*args, **kwargs)
+            token, last_modified = version
+            etag = _etag(token, salt_fn())
+
+            if request.if_none_match:
+                not_modified = _matches(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and last_modified <= since
+            if not_modified:
+                resp = Response(status=304)
+            else:
+                resp = make_response(view(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+            resp.set_etag(etag)
+            resp.last_modified = last_modified
+            resp.headers["Cache-Control"] = "no-cache"  # always revalidate; cheap thanks to the ETag
+            return resp
+        return wrapped
+    return decorator
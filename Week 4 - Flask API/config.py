@@ -5,3 +5,66 @@ class Config:
     APP_NAME = "Week 4 Flask API"
     JSON_SORT_KEYS = False
     OPENWEATHER_KEY = os.getenv("OPENWEATHER_API_KEY")
+    # current-weather endpoint; point it at bench/fake_openweather.py for load tests
+    OPENWEATHER_URL = os.getenv("OPENWEATHER_URL", "https://api.openweathermap.org/data/2.5/weather")
+    # weather cache: entries live CACHE_TTL seconds; least-recently-used go past the cap
+    CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    # "memory" (per process) or "sqlite" (shared by all workers on the host, survives restarts)
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "data/weather_cache.sqlite")
+    # learned city aliases ("NYC" -> OpenWeather city id), shared by workers/restarts
+    CITY_ALIASES_PATH = os.getenv("CITY_ALIASES_PATH", "data/city_aliases.json")
+    # serve an expired entry (flagged stale) while refreshing it in the background,
+    # for at most CACHE_MAX_STALE seconds past its TTL; after that requests block
+    CACHE_STALE_WHILE_REVALIDATE = os.getenv("CACHE_STALE_WHILE_REVALIDATE", "0") == "1"
+    CACHE_MAX_STALE = int(os.getenv("CACHE_MAX_STALE", "600"))
+    # bulk /weather: at most BULK_CONCURRENCY upstream calls in flight (process-wide)
+    BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "128"))
+    # every OpenWeather call (single, bulk, background refresh) takes a token from one
+    # bucket: bursts of OPENWEATHER_BURST, then OPENWEATHER_RATE_PER_SEC (<= 0 disables it).
+    # Set these to your plan's limits. Misses beyond the burst wait their turn, so a cold
+    # bulk request of N misses takes about max(0, N - burst) / rate seconds longer.
+    OPENWEATHER_RATE_PER_SEC = float(os.getenv("OPENWEATHER_RATE_PER_SEC", "20"))
+    OPENWEATHER_BURST = float(os.getenv("OPENWEATHER_BURST", "200"))
+    # OpenWeather HTTP session: pool sized to BULK_CONCURRENCY, retries on 429/5xx
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+    HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))
+    # a 429's Retry-After is honored for at most this many seconds (the wait blocks the request)
+    HTTP_MAX_RETRY_AFTER = float(os.getenv("HTTP_MAX_RETRY_AFTER", "2"))
+    # parse data/weather_log.csv into memory (and catch up the sidecars) at startup, off-thread
+    LOG_INDEX_PRELOAD = os.getenv("LOG_INDEX_PRELOAD", "1") == "1"
+    # responses: orjson for jsonify when installed; gzip/br (negotiated) above a size threshold
+    FAST_JSON = os.getenv("FAST_JSON", "1") == "1"
+    COMPRESS_RESPONSES = os.getenv("COMPRESS_RESPONSES", "1") == "1"
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+    # Server-Timing header on every response; SERVER_TIMING_LOG also puts the spans in data/access.log
+    SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+    SERVER_TIMING_LOG = os.getenv("SERVER_TIMING_LOG", "0") == "1"
+    # ?profile=1 (cProfile → .pstats) / ?profile=sample (collapsed stacks) for one request;
+    # allowed when PROFILING_ENABLED=1 or PROFILE_ADMIN_TOKEN is set; a set token is always
+    # required (X-Admin-Token header), even with PROFILING_ENABLED=1
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+    PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN") or None
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+    PROFILE_SAMPLE_MS = float(os.getenv("PROFILE_SAMPLE_MS", "1"))
+    # history reads: "csv" (log index + sidecars) or "columnar" (memory-mapped
+    # numpy columns in data/weather_log.cols/, needs numpy). /history/query always
+    # reads the column store (and needs numpy): the preload builds it on the columnar
+    # backend or with HISTORY_QUERY_PRELOAD=1, otherwise the first query builds it
+    HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "csv")
+    HISTORY_QUERY_PRELOAD = os.getenv("HISTORY_QUERY_PRELOAD", "0") == "1"
+    # chart series longer than this are downsampled (LTTB); override per request with ?points=
+    CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "200"))
+    # /chart/png: rendered images kept in memory (LRU)
+    CHART_CACHE_ENTRIES = int(os.getenv("CHART_CACHE_ENTRIES", "128"))
+    # background CSV writer: flush every N rows or M ms, whichever comes first
+    LOG_WRITER_BATCH_ROWS = int(os.getenv("LOG_WRITER_BATCH_ROWS", "200"))
+    LOG_WRITER_FLUSH_MS = int(os.getenv("LOG_WRITER_FLUSH_MS", "250"))
+    LOG_WRITER_QUEUE_SIZE = int(os.getenv("LOG_WRITER_QUEUE_SIZE", "10000"))
+    # data/access.log rotation: "size" (ACCESS_LOG_MAX_BYTES) or "time" (ACCESS_LOG_WHEN)
+    ACCESS_LOG_ROTATION = os.getenv("ACCESS_LOG_ROTATION", "size")
+    ACCESS_LOG_MAX_BYTES = int(os.getenv("ACCESS_LOG_MAX_BYTES", "5000000"))
+    ACCESS_LOG_WHEN = os.getenv("ACCESS_LOG_WHEN", "midnight")
+    ACCESS_LOG_BACKUPS = int(os.getenv("ACCESS_LOG_BACKUPS", "5"))
@@ -0,0 +1,270 @@
+# daily_rollups.py
+"""
+Incrementally maintained daily rollups for data/weather_log.csv.
+Why: /history/daily and /history/stats only need per-day sums, so keep
+count/sum/min/max per (city, units, day) and answer in O(days), not O(samples).
+
+Stored in a SQLite file next to the log (weather_log.csv.rollups.sqlite).
+Like the city offset sidecar, it remembers how many bytes of the log it has
+folded in, so rows written by other processes are caught up on the next query.
+Catch-ups and appends run in BEGIN IMMEDIATE transactions, so several workers
+sharing the file never fold a row in twice. The app builds it in the startup
+preload thread (refresh()).
+
+CLI:
+    python daily_rollups.py rebuild [--log data/weather_log.csv]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple
+
+from log_index import parse_row, scan_lines
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS rollups (
+    city       TEXT    NOT NULL,
+    units      TEXT    NOT NULL,
+    day        TEXT    NOT NULL,
+    count      INTEGER NOT NULL,
+    temp_count INTEGER NOT NULL,
+    temp_sum   REAL    NOT NULL,
+    temp_min   REAL,
+    temp_max   REAL,
+    hum_count  INTEGER NOT NULL,
+    hum_sum    REAL    NOT NULL,
+    PRIMARY KEY (city, units, day)
+);
+"""
+
+UPSERT = """
+INSERT INTO rollups (city, units, day, count, temp_count, temp_sum, temp_min, temp_max, hum_count, hum_sum)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (city, units, day) DO UPDATE SET
+    count      = count + excluded.count,
+    temp_count = temp_count + excluded.temp_count,
+    temp_sum   = temp_sum + excluded.temp_sum,
+    temp_min   = CASE WHEN temp_min IS NULL THEN excluded.temp_min
+                      WHEN excluded.temp_min IS NULL THEN temp_min
+                      ELSE MIN(temp_min, excluded.temp_min) END,
+    temp_max   = CASE WHEN temp_max IS NULL THEN excluded.temp_max
+                      WHEN excluded.temp_max IS NULL THEN temp_max
+                      ELSE MAX(temp_max, excluded.temp_max) END,
+    hum_count  = hum_count + excluded.hum_count,
+    hum_sum    = hum_sum + excluded.hum_sum
+"""
+
+# SELECT list shared by stats() and daily()
+AGGREGATES = """
+    SUM(count), SUM(temp_count), SUM(temp_sum), MIN(temp_min), MAX(temp_max),
+    SUM(hum_count), SUM(hum_sum)
+"""
+
+Key = Tuple[str, str, str]
+
+
+def rollups_path(log_path: str) -> str:
+    return os.path.abspath(log_path) + ".rollups.sqlite"
+
+
+def fold_row(acc: Dict[Key, List[Any]], r: Dict[str, Any]) -> None:
+    """Add one parsed row to {(city, units, day): [count, tc, tsum, tmin, tmax, hc, hsum]}."""
+    key = ((r.get("city") or "").lower(), r.get("units") or "", (r.get("ts") or "").split("T")[0])
+    a = acc.setdefault(key, [0, 0, 0.0, None, None, 0, 0.0])
+    a[0] += 1
+    t, h = r.get("temp"), r.get("humidity")
+    if t is not None:
+        a[1] += 1
+        a[2] += t
+        a[3] = t if a[3] is None else min(a[3], t)
+        a[4] = t if a[4] is None else max(a[4], t)
+    if h is not None:
+        a[5] += 1
+        a[6] += h
+
+
+def _summary(count, temp_count, temp_sum, temp_min, temp_max, hum_count, hum_sum) -> Dict[str, Any]:
+    return {
+        "avg_temp": round(temp_sum / temp_count, 2) if temp_count else None,
+        "min_temp": temp_min,
+        "max_temp": temp_max,
+        "avg_humidity": round(hum_sum / hum_count, 2) if hum_count else None,
+    }
+
+
+class DailyRollups:
+    """(city, units, day) -> count/sum/min/max of temp + sum of humidity."""
+
+    def __init__(self, log_path: str):
+        self.log_path = os.path.abspath(log_path)
+        self.db_path = rollups_path(self.log_path)
+        self._lock = threading.Lock()
+
+    # ---- plumbing -----------------------------------------------------
+
+    def exists(self) -> bool:
+        return os.path.exists(self.db_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    @staticmethod
+    def _meta(conn: sqlite3.Connection) -> Dict[str, str]:
+        return dict(conn.execute("SELECT key, value FROM meta"))
+
+    @staticmethod
+    def _set_meta(conn: sqlite3.Connection, **values: Any) -> None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(k, str(v)) for k, v in values.items()],
+        )
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, acc: Dict[Key, List[Any]]) -> None:
+        conn.executemany(UPSERT, [(*key, *vals) for key, vals in acc.items()])
+
+    def _sync(self, conn: sqlite3.Connection, rebuild: bool = False) -> None:
+        """
+        Fold any unseen bytes of the log into the rollups (caller holds the lock).
+        Other processes share the file, so the catch-up runs in a BEGIN IMMEDIATE
+        transaction and re-reads meta inside it: whoever gets the write lock
+        second sees the first one's progress instead of folding the same rows in.
+        """
+        if not rebuild and self._current(conn):
+            return  # cheap read-only check; no write lock for the common case
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._catch_up(conn, rebuild)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def _current(self, conn: sqlite3.Connection) -> bool:
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return False
+        meta = self._meta(conn)
+        return meta.get("inode") == str(st.st_ino) and meta.get("size") == str(st.st_size)
+
+    def _catch_up(self, conn: sqlite3.Connection, rebuild: bool = False) -> None:
+        """Fold whatever the rollups don't cover yet (inside a write transaction)."""
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            conn.execute("DELETE FROM rollups")
+            conn.execute("DELETE FROM meta")
+            return
+
+        meta = self._meta(conn)
+        covered = int(meta.get("size", 0))
+        header = meta["header"].split(",") if meta.get("header") else None
+        if rebuild or meta.get("inode") != str(st.st_ino) or st.st_size < covered:
+            conn.execute("DELETE FROM rollups")
+            covered, header = 0, None
+        elif st.st_size == covered:
+            return
+
+        acc: Dict[Key, List[Any]] = {}
+        end, header = scan_lines(self.log_path, covered, header,
+                                 lambda offset, length, fields: fold_row(acc, parse_row(fields)))
+        self._apply(conn, acc)
+        self._set_meta(conn, size=end, inode=st.st_ino, header=",".join(header or []))
+
+    # ---- public API ---------------------------------------------------
+
+    def rebuild(self) -> int:
+        """Recreate the rollups from the raw CSV; returns the number of buckets."""
+        with self._lock, closing(self._connect()) as conn, conn:
+            self._sync(conn, rebuild=True)
+            return conn.execute("SELECT COUNT(*) FROM rollups").fetchone()[0]
+
+    def refresh(self) -> None:
+        """Create the rollups if needed and catch up with the log (startup preload)."""
+        with self._lock, closing(self._connect()) as conn, conn:
+            self._sync(conn)
+
+    def note_appended(self, written: List[Tuple[Dict[str, Any], int, int]]) -> None:
+        """Fold in rows just written by the log writer as (row, offset, length) (existing store only)."""
+        if not written or not self.exists():
+            return
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")  # meta check + UPSERTs + meta update as one unit
+            meta = self._meta(conn)
+            if meta.get("size") == str(written[0][1]) and meta.get("header"):
+                acc: Dict[Key, List[Any]] = {}
+                for row, _, _ in written:
+                    fold_row(acc, parse_row({k: str(v) for k, v in row.items()}))
+                self._apply(conn, acc)
+                _, offset, length = written[-1]
+                self._set_meta(conn, size=offset + length)
+            else:
+                self._catch_up(conn)
+
+    def _where(self, city: Optional[str]) -> Tuple[str, Tuple[Any, ...]]:
+        return ("WHERE city = ?", (city.lower(),)) if city else ("", ())
+
+    def stats(self, city: str | None = None) -> Optional[Dict[str, Any]]:
+        """Totals across all days/units (None if there are no samples)."""
+        where, params = self._where(city)
+        with self._lock, closing(self._connect()) as conn, conn:
+            self._sync(conn)
+            agg = conn.execute(f"SELECT {AGGREGATES} FROM rollups {where}", params).fetchone()
+        if not agg[0]:
+            return None
+        return {"samples": agg[0], **_summary(*agg)}
+
+    def daily(self, city: str | None = None) -> Optional[List[Dict[str, Any]]]:
+        """One entry per day, oldest first (None if there are no samples)."""
+        where, params = self._where(city)
+        with self._lock, closing(self._connect()) as conn, conn:
+            self._sync(conn)
+            buckets = conn.execute(
+                f"SELECT day, {AGGREGATES} FROM rollups {where} GROUP BY day ORDER BY day", params
+            ).fetchall()
+        if not buckets:
+            return None
+        return [
+            {"date": day, "count": agg[0], **_summary(*agg)}
+            for day, *agg in buckets
+            if day  # rows without a timestamp count as samples but not as a day
+        ]
+
+
+_stores: Dict[str, DailyRollups] = {}
+_stores_lock = threading.Lock()
+
+
+def get_rollups(log_path: str) -> DailyRollups:
+    """Return the shared rollup store for this log path."""
+    key = os.path.abspath(log_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = DailyRollups(key)
+    return store
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Daily rollups for weather_log.csv")
+    p.add_argument("command", choices=["rebuild"], help="rebuild: recreate the rollups from the raw CSV")
+    p.add_argument("--log", default="data/weather_log.csv", help="Path to the CSV log")
+    args = p.parse_args()
+
+    if not os.path.exists(args.log):
+        raise SystemExit(f"Missing {args.log}")
+    n = DailyRollups(args.log).rebuild()
+    print(f"Rebuilt {n} (city, units, day) buckets → {rollups_path(args.log)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# downsample.py
+"""
+Largest-Triangle-Three-Buckets (Steinarsson, 2013) for chart series.
+Why: make_chart() put every selected point into the QuickChart URL, so a long
+`limit` produced URLs past practical length limits. LTTB keeps `threshold`
+points that preserve the visual shape (peaks and dips survive, flat runs
+collapse), so the chart payload is bounded however much history we have.
+Pure Python, O(n): no numpy needed on the default (csv) backend.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """Indices of the points to keep (always the first and last)."""
+    n = len(xs)
+    if threshold >= n or n <= 2:
+        return list(range(n))
+    threshold = max(3, threshold)
+    every = (n - 2) / (threshold - 2)
+    keep = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # average of the next bucket is the third triangle corner
+        nxt_lo = int((i + 1) * every) + 1
+        nxt_hi = min(int((i + 2) * every) + 1, n)
+        span = nxt_hi - nxt_lo
+        avg_x = sum(xs[nxt_lo:nxt_hi]) / span
+        avg_y = sum(ys[nxt_lo:nxt_hi]) / span
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = -1, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        keep.append(best)
+        a = best
+    keep.append(n - 1)
+    return keep
+
+
+def _x(ts: Optional[str], fallback: int) -> float:
+    try:
+        return datetime.fromisoformat(ts).timestamp() if ts else float(fallback)
+    except ValueError:
+        return float(fallback)
+
+
+def downsample_records(records: List[Dict[str, Any]], points: int) -> List[Dict[str, Any]]:
+    """Rows with a temp, reduced to at most `points` by LTTB over (ts, temp)."""
+    rows = [r for r in records if r.get("temp") is not None]
+    if len(rows) <= points:
+        return rows
+    xs = [_x(r.get("ts"), i) for i, r in enumerate(rows)]
+    ys = [r["temp"] for r in rows]
+    return [rows[i] for i in lttb(xs, ys, points)]
@@ -0,0 +1,81 @@
+# history_pages.py
+"""
+Cursor pagination for /history (?after=<cursor>&limit=500).
+Why: "last N rows" made clients re-read everything to walk the history. A
+cursor here is an opaque token for a byte offset in data/weather_log.csv
+(plus the log's inode), so a page seeks straight to its first row and reads
+only `limit` rows — O(page), not O(file). City pages take their offsets from
+the city offset sidecar (city_offsets.py).
+
+An empty `after=` starts at the oldest row. The last page's `next` cursor
+stays valid, so polling it later returns rows appended since. A cursor from a
+rotated/truncated log is rejected (ValueError) — start over from `after=`.
+"""
+from __future__ import annotations
+
+import base64
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from city_offsets import get_offsets
+from log_index import parse_row, read_header, scan_lines
+
+DEFAULT_PAGE = 500
+MAX_PAGE = 5000
+
+
+def encode_cursor(inode: int, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"v1:{inode}:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[int, int]:
+    """token -> (inode, offset); ValueError if it is not one of ours."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        version, inode, offset = raw.split(":")
+        if version != "v1":
+            raise ValueError
+        return int(inode), int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("invalid cursor") from None
+
+
+def read_page(log_path: str, after: Optional[str], limit: int = DEFAULT_PAGE,
+              city: Optional[str] = None) -> Dict[str, Any]:
+    """One page of rows (oldest→newest) after the cursor, plus the cursor for the next."""
+    limit = max(1, min(int(limit), MAX_PAGE))
+    try:
+        st = os.stat(log_path)
+    except FileNotFoundError:
+        return {"records": [], "count": 0, "next": None, "has_more": False}
+
+    start = 0
+    if after:
+        inode, start = decode_cursor(after)
+        if inode != st.st_ino or start > st.st_size:
+            raise ValueError("cursor is from a rotated or truncated log; restart with after=")
+
+    # one extra row tells us whether there is another page
+    rows: List[Tuple[int, int, Dict[str, Any]]]
+    if city:
+        rows = get_offsets(log_path).read_city_after(city, start, limit + 1)
+        end = start
+    else:
+        rows = []
+        end, _ = scan_lines(
+            log_path, start, read_header(log_path) if start else None,
+            lambda offset, length, fields: rows.append((offset, length, parse_row(fields))),
+            max_rows=limit + 1,
+        )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        offset, length, _ = rows[-1]
+        end = offset + length
+    return {
+        "records": [row for _, _, row in rows],
+        "count": len(rows),
+        "next": encode_cursor(st.st_ino, end),
+        "has_more": has_more,
+    }
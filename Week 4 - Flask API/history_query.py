@@ -0,0 +1,204 @@
+# history_query.py
+"""
+Group-by / aggregate engine behind GET /history/query.
+Why: /history/stats could only do avg/min/max, one Python loop per request.
+This runs over the memory-mapped column store (columnar_log.py) with numpy:
+rows are filtered with boolean masks, grouped by integer keys, and every
+aggregate (percentiles included) is computed for all groups at once from one
+sort — no per-row Python.
+
+    group_by:  any of city, units + at most one of day, hour, week (ISO, Monday)
+    range:     start <= ts < end (ISO-8601; naive means UTC)
+    metrics:   temp, humidity, wind_speed
+    aggs:      count, mean, min, max, stddev (population), p50, p95, p99
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from columnar_log import EPOCH, MISSING_TS, US_PER_DAY, Columns, _ts_to_us
+
+US_PER_HOUR = 3_600_000_000
+
+KEYS = ("city", "units")
+BUCKETS = ("day", "hour", "week")
+METRICS = {"temp": "temp", "humidity": "humidity", "wind_speed": "wind"}  # name -> column
+AGGS = ("count", "mean", "min", "max", "stddev", "p50", "p95", "p99")
+PERCENTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+
+def _parse_list(value: Optional[str], allowed: Sequence[str], default: Sequence[str], what: str) -> List[str]:
+    items = [v.strip().lower() for v in value.split(",") if v.strip()] if value else list(default)
+    bad = [v for v in items if v not in allowed]
+    if bad:
+        raise ValueError(f"Unknown {what}: {', '.join(bad)} (allowed: {', '.join(allowed)})")
+    return list(dict.fromkeys(items))
+
+
+def _parse_ts(value: Optional[str], name: str) -> Optional[int]:
+    if not value:
+        return None
+    us = _ts_to_us(value)
+    if us == MISSING_TS:
+        raise ValueError(f"'{name}' must be an ISO-8601 timestamp")
+    return us
+
+
+def _bucket_ids(ts: np.ndarray, bucket: str) -> np.ndarray:
+    if bucket == "hour":
+        return ts // US_PER_HOUR
+    days = ts // US_PER_DAY
+    if bucket == "week":
+        return (days + 3) // 7  # 1970-01-01 was a Thursday; shift so weeks start on Monday
+    return days
+
+
+def _bucket_label(value: int, bucket: str) -> str:
+    if bucket == "hour":
+        return (EPOCH + timedelta(hours=value)).isoformat()
+    days = value * 7 - 3 if bucket == "week" else value
+    return (EPOCH + timedelta(days=days)).date().isoformat()
+
+
+def _factorize(column: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(sorted distinct values, index of each row's value) — like np.unique(return_inverse=True)."""
+    column = column.astype(np.int64, copy=False)
+    lo = int(column.min())
+    span = int(column.max()) - lo + 1
+    if span > max(len(column), 1 << 20):
+        values, inverse = np.unique(column, return_inverse=True)
+        return values, inverse.reshape(-1)
+    # dense keys (dictionary codes, time buckets): counting beats sorting
+    shifted = column - lo
+    present = np.bincount(shifted, minlength=span) > 0
+    remap = np.cumsum(present) - 1
+    return np.flatnonzero(present) + lo, remap[shifted]
+
+
+def _aggregate(values: np.ndarray, groups: np.ndarray, n_groups: int, aggs: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Every aggregate for every group at once; order statistics read from a (group, value) sort."""
+    keep = ~np.isnan(values)
+    values, groups = values[keep], groups[keep]
+    if any(a in aggs for a in ("min", "max", *PERCENTILES)):
+        # sort by value, then stable-sort by group: same order as lexsort, ~3x faster
+        order = np.argsort(values)
+        order = order[np.argsort(groups[order], kind="stable")]
+        values, groups = values[order], groups[order]
+
+    n = np.bincount(groups, minlength=n_groups)
+    start = np.concatenate(([0], np.cumsum(n)[:-1]))
+    has = n > 0
+    last = np.where(has, start + n - 1, 0)
+    out: Dict[str, np.ndarray] = {"count": n}
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(groups, weights=values, minlength=n_groups) / n
+        if "mean" in aggs:
+            out["mean"] = mean
+        if "stddev" in aggs:
+            dev = values - mean[groups]
+            out["stddev"] = np.sqrt(np.bincount(groups, weights=dev * dev, minlength=n_groups) / n)
+    if len(values):
+        if "min" in aggs:
+            out["min"] = np.where(has, values[np.where(has, start, 0)], np.nan)
+        if "max" in aggs:
+            out["max"] = np.where(has, values[last], np.nan)
+        for name, q in PERCENTILES.items():
+            if name in aggs:
+                # linear interpolation between closest ranks (numpy's default method)
+                pos = start + q * np.maximum(n - 1, 0)
+                lo = np.floor(pos).astype(np.int64)
+                hi = np.minimum(lo + 1, last)
+                lo = np.where(has, lo, 0)
+                hi = np.where(has, hi, 0)
+                out[name] = np.where(has, values[lo] + (values[hi] - values[lo]) * (pos - lo), np.nan)
+    else:
+        for name in ("min", "max", *PERCENTILES):
+            if name in aggs:
+                out[name] = np.full(n_groups, np.nan)
+    return out
+
+
+def _value(x: Any) -> Any:
+    if isinstance(x, (np.integer,)):
+        return int(x)
+    x = float(x)
+    return None if np.isnan(x) else round(x, 2)
+
+
+def run_query(
+    cols: Optional[Columns],
+    group_by: Optional[str] = None,
+    metrics: Optional[str] = None,
+    aggs: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    city: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Parse the query-string style arguments and aggregate. Raises ValueError on bad input."""
+    keys = _parse_list(group_by, KEYS + BUCKETS, ("city", "units"), "group_by")
+    buckets = [k for k in keys if k in BUCKETS]
+    if len(buckets) > 1:
+        raise ValueError("group_by accepts at most one of day, hour, week")
+    metric_names = _parse_list(metrics, tuple(METRICS), ("temp",), "metric")
+    agg_names = _parse_list(aggs, AGGS, ("count", "mean", "min", "max"), "agg")
+    start_us, end_us = _parse_ts(start, "start"), _parse_ts(end, "end")
+
+    result: Dict[str, Any] = {
+        "group_by": keys, "metrics": metric_names, "aggs": agg_names,
+        "start": start, "end": end, "city": city,
+        "rows_matched": 0, "groups": [],
+    }
+    if cols is None or not cols.rows:
+        return result
+
+    ts = np.asarray(cols["ts"])
+    mask = np.ones(cols.rows, dtype=bool)
+    city_mask = cols.city_mask(city)
+    if city_mask is not None:
+        mask &= city_mask
+    if buckets or start_us is not None or end_us is not None:
+        mask &= ts != MISSING_TS
+    if start_us is not None:
+        mask &= ts >= start_us
+    if end_us is not None:
+        mask &= ts < end_us
+    idx = np.flatnonzero(mask)
+    result["rows_matched"] = int(len(idx))
+    if not len(idx):
+        return result
+
+    # factorize each key column, then fold them into one int64 group id
+    # (far cheaper than a row-wise unique over stacked keys)
+    combined = np.zeros(len(idx), dtype=np.int64)
+    levels = []
+    for k in keys:
+        column = _bucket_ids(ts[idx], k) if k in BUCKETS else np.asarray(cols[k])[idx]
+        values, inverse = _factorize(column)
+        combined = combined * len(values) + inverse
+        levels.append(values)
+    group_ids, groups = _factorize(combined)
+    n_groups = len(group_ids)
+    uniq = np.stack(np.unravel_index(group_ids, [len(v) for v in levels]), axis=1)
+
+    per_metric = {
+        m: _aggregate(np.asarray(cols[METRICS[m]])[idx], groups, n_groups, agg_names)
+        for m in metric_names
+    }
+    samples = np.bincount(groups, minlength=n_groups)
+
+    out = []
+    for g, key in enumerate(uniq):
+        row: Dict[str, Any] = {}
+        for k, level, i in zip(keys, levels, key):
+            v = int(level[i])
+            row[k] = _bucket_label(v, k) if k in BUCKETS else cols.dicts[k][v]
+        row["samples"] = int(samples[g])
+        for m in metric_names:
+            row[m] = {a: _value(per_metric[m][a][g]) for a in agg_names}
+        out.append(row)
+    result["groups"] = out
+    return result
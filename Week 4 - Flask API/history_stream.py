@@ -0,0 +1,89 @@
+# history_stream.py
+"""
+Streamed /history bodies (?format=ndjson|csv) and a one-pass summary.
+Why: /history built the whole records list plus a JSON document before
+answering; with no city filter and a big limit that was hundreds of MB per
+request. Here rows are encoded as they are read, a few hundred per chunk,
+and the summary is folded in along the way and sent as a trailer:
+
+    ndjson: one JSON object per line, then {"summary": {...}}
+    csv:    header + rows, then a "# {"summary": {...}}" comment line
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+FIELDS = ("ts", "city", "units", "temp", "humidity", "description")
+MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+class RunningSummary:
+    """count / avg / min / max of temp and avg humidity, updated row by row."""
+
+    def __init__(self, city: Optional[str] = None):
+        self.city = city
+        self.count = 0
+        self.temp_count = 0
+        self.temp_sum = 0.0
+        self.temp_min: Optional[float] = None
+        self.temp_max: Optional[float] = None
+        self.hum_count = 0
+        self.hum_sum = 0.0
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self.count += 1
+        temp, hum = row.get("temp"), row.get("humidity")
+        if temp is not None:
+            self.temp_count += 1
+            self.temp_sum += temp
+            self.temp_min = temp if self.temp_min is None else min(self.temp_min, temp)
+            self.temp_max = temp if self.temp_max is None else max(self.temp_max, temp)
+        if hum is not None:
+            self.hum_count += 1
+            self.hum_sum += hum
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "city": self.city or "All",
+            "count": self.count,
+            "avg_temp": round(self.temp_sum / self.temp_count, 2) if self.temp_count else None,
+            "min_temp": self.temp_min,
+            "max_temp": self.temp_max,
+            "avg_humidity": round(self.hum_sum / self.hum_count, 2) if self.hum_count else None,
+        }
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], summary: RunningSummary, size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        summary.add(row)
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_history(rows: Iterable[Dict[str, Any]], fmt: str, city: Optional[str] = None,
+                   chunk_rows: int = 500) -> Iterator[str]:
+    """Encode rows as they come; the last piece is the summary trailer."""
+    summary = RunningSummary(city)
+    if fmt == "ndjson":
+        for batch in _chunks(rows, summary, chunk_rows):
+            yield "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in batch)
+        yield json.dumps({"summary": summary.as_dict()}, separators=(",", ":")) + "\n"
+        return
+
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(FIELDS)
+    for batch in _chunks(rows, summary, chunk_rows):
+        writer.writerows([r.get(f) for f in FIELDS] for r in batch)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue() + "# " + json.dumps({"summary": summary.as_dict()}, separators=(",", ":")) + "\n"
@@ -0,0 +1,93 @@
+# http_utils.py
+"""
+HTTP utilities: a long-lived requests.Session with a sized connection pool,
+keep-alive, and retries/backoff on 429/5xx (same idea as week2/http_utils.py).
+Why: every cache miss used to pay a fresh TCP+TLS handshake via bare requests.get.
+A server Retry-After is honored but capped (max_retry_after): the retry sleeps on
+the request thread, and with it every coalesced waiter and bulk worker behind it.
+"""
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class CappedRetry(Retry):
+    """Retry that sleeps at most `max_retry_after` seconds for a Retry-After header."""
+
+    def __init__(self, *args: Any, max_retry_after: float = 2.0, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kw: Any) -> "CappedRetry":
+        retry = super().new(**kw)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, self.max_retry_after)
+
+
+def make_session(
+    total: int = 2,
+    backoff: float = 0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=("GET",),
+    pool_connections: int = 4,
+    pool_maxsize: int = 6,
+    user_agent: str = "week4-flask-api/0.1",
+    max_retry_after: float = 2.0,
+) -> requests.Session:
+    """
+    pool_connections: how many hosts keep a pool
+    pool_maxsize:     connections kept alive per host (size it to the bulk concurrency)
+    max_retry_after:  longest sleep a server's Retry-After can ask for, in seconds
+    """
+    retry = CappedRetry(
+        total=total,
+        connect=total,
+        read=total,
+        backoff_factor=backoff,          # 0.5s, 1.0s, 2.0s ...
+        status_forcelist=status_forcelist,
+        allowed_methods=allowed_methods,
+        raise_on_status=False,           # hand the final 429/5xx back to the caller
+        respect_retry_after_header=True, # honor server Retry-After, up to max_retry_after
+        max_retry_after=max_retry_after,
+    )
+
+    adapter = HTTPAdapter(
+        max_retries=retry,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+    )
+
+    s = requests.Session()
+    s.headers.update({"User-Agent": user_agent, "Connection": "keep-alive"})
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+
+def pool_stats(session: requests.Session) -> Dict[str, Any]:
+    """Connections opened vs requests served across the session's pools."""
+    created = requests_sent = 0
+    hosts = set()
+    for adapter in set(session.adapters.values()):
+        pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+        if pools is None:
+            continue
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts.add(f"{pool.scheme}://{pool.host}:{pool.port}")
+            created += pool.num_connections
+            requests_sent += pool.num_requests
+    return {
+        "hosts": sorted(hosts),
+        "connections_created": created,
+        "requests": requests_sent,
+        "connections_reused": max(0, requests_sent - created),
+    }
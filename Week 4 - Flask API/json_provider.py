@@ -0,0 +1,55 @@
+# json_provider.py
+"""
+orjson-backed Flask JSON provider (jsonify, request.get_json, ...).
+Why: /history and bulk /weather bodies are large, repetitive JSON and the
+stdlib encoder was a visible share of request time; orjson serializes the
+same documents several times faster straight to bytes.
+
+Same knobs as Flask's DefaultJSONProvider: sort_keys, and compact/debug
+indentation (orjson only indents by 2, which is Flask's default anyway).
+Anything orjson can't encode natively (dates, Decimal, UUID, ...) goes
+through Flask's default() so values serialize the same way as before.
+orjson is optional: install_json_provider() is a no-op without it.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    def _options(self, indent: bool = False) -> int:
+        # numpy scalars from the column store: the stdlib encoder took np.float64 as a float
+        opts = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            opts |= orjson.OPT_SORT_KEYS
+        if indent:
+            opts |= orjson.OPT_INDENT_2
+        return opts
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def install_json_provider(app: Flask) -> bool:
+    """Use orjson for app.json if it is installed; returns whether it was."""
+    if orjson is None:
+        return False
+    app.json = OrjsonProvider(app)
+    return True
@@ -0,0 +1,173 @@
+# log_index.py
+"""
+Process-wide, tail-following index over data/weather_log.csv.
+Why: parse the log once, then only read the bytes appended since the last look
+instead of re-decoding the whole file on every request.
+"""
+from __future__ import annotations
+
+import csv
+import os
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+def _num(val: Optional[str]) -> Optional[float]:
+    return float(val) if val not in (None, "", "None") else None
+
+
+def parse_row(row: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """Normalize one CSV row into the dict shape the history routes return."""
+    return {
+        "ts": row.get("ts"),
+        "city": row.get("city"),
+        "units": row.get("units"),
+        "temp": _num(row.get("temp")),
+        "humidity": _num(row.get("humidity")),
+        "description": row.get("description"),
+    }
+
+
+def split_csv_line(raw: bytes) -> List[str]:
+    return next(csv.reader([raw.decode("utf-8").rstrip("\r\n")]), [])
+
+
+def scan_lines(
+    path: str,
+    start: int,
+    header: Optional[List[str]],
+    on_row: Callable[[int, int, Dict[str, str]], None],
+    max_rows: Optional[int] = None,
+) -> Tuple[int, Optional[List[str]]]:
+    """
+    Walk complete lines of the CSV from byte `start`, calling
+    on_row(offset, length, fields) for each data row (at most `max_rows`).
+    Returns (end_offset, header); a trailing half-written line is left for later.
+    """
+    pos = start
+    seen = 0
+    with open(path, "rb") as f:
+        f.seek(start)
+        for raw in f:
+            if not raw.endswith(b"\n") or (max_rows is not None and seen >= max_rows):
+                break
+            offset, pos = pos, pos + len(raw)
+            values = split_csv_line(raw)
+            if not values:
+                continue
+            if header is None:
+                header = [v.lstrip("\ufeff") for v in values]
+                continue
+            on_row(offset, len(raw), dict(zip(header, values)))
+            seen += 1
+    return pos, header
+
+
+def read_header(path: str) -> Optional[List[str]]:
+    """Column names from the first line of the CSV (None if it is empty)."""
+    with open(path, "rb") as f:
+        first = f.readline()
+    if not first.endswith(b"\n"):
+        return None
+    return [v.lstrip("\ufeff") for v in split_csv_line(first)] or None
+
+
+class WeatherLogIndex:
+    """
+    In-memory rows for one CSV log, plus per-city row lists.
+
+    refresh() stats the file and:
+      - does nothing if size/mtime are unchanged
+      - reads only the new bytes after the remembered offset if it grew
+      - re-parses from scratch if it was rotated (new inode) or truncated
+    Rows are shared between callers; treat them as read-only.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._rows: List[Dict[str, Any]] = []
+        self._by_city: Dict[str, List[Dict[str, Any]]] = {}
+        self._header: Optional[List[str]] = None
+        self._offset = 0
+        self._ident: Optional[Tuple[int, int]] = None  # (st_dev, st_ino)
+        self._mtime_ns: Optional[int] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._ident is not None
+
+    def refresh(self) -> None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            with self._lock:
+                self._reset()
+            return
+
+        with self._lock:
+            ident = (st.st_dev, st.st_ino)
+            if ident == self._ident and st.st_size == self._offset and st.st_mtime_ns == self._mtime_ns:
+                return  # nothing new
+            if ident != self._ident or st.st_size < self._offset or st.st_size == self._offset:
+                # rotated, truncated, or rewritten in place -> start over
+                self._reset()
+            self._read_tail()
+            self._ident = ident
+            self._mtime_ns = st.st_mtime_ns
+
+    def _read_tail(self) -> None:
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        # only consume complete lines; a half-written row is picked up next time
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            return
+        chunk = chunk[: end + 1]
+        self._offset += len(chunk)
+
+        lines = chunk.decode("utf-8").split("\n")
+        for values in csv.reader(lines):
+            if not values:
+                continue
+            if self._header is None:
+                self._header = [v.lstrip("\ufeff") for v in values]
+                continue
+            row = parse_row(dict(zip(self._header, values)))
+            self._rows.append(row)
+            self._by_city.setdefault((row["city"] or "").lower(), []).append(row)
+
+    def select(self, city: str | None = None, limit: int | None = None) -> List[Dict[str, Any]]:
+        """Rows in file order (oldest→newest), optionally for one city / last N."""
+        with self._lock:
+            rows = self._by_city.get(city.lower(), []) if city else self._rows
+            if limit:
+                return rows[-int(limit):]
+            return list(rows)
+
+    def iter_select(self, city: str | None = None, limit: int | None = None) -> Iterator[Dict[str, Any]]:
+        """Like select(), but yields rows without copying the list (for streamed responses)."""
+        with self._lock:
+            rows = self._by_city.get(city.lower(), []) if city else self._rows
+            end = len(rows)
+        # appends only extend the list and a reset swaps in a new one, so rows[:end] is stable
+        for i in range(max(0, end - int(limit)) if limit else 0, end):
+            yield rows[i]
+
+
+_indexes: Dict[str, WeatherLogIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(path: str) -> WeatherLogIndex:
+    """Return the shared index for this log path (one per absolute path)."""
+    key = os.path.abspath(path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = WeatherLogIndex(key)
+    return index
@@ -0,0 +1,230 @@
+# log_writer.py
+"""
+Single background writer for data/weather_log.csv.
+Why: request threads (and the bulk endpoint's workers) only enqueue rows;
+one thread owns the file, batches rows and appends them with one write,
+so lines never interleave and we stop paying an open/close per row.
+
+Batches are flushed every `batch_rows` rows or `flush_ms` milliseconds,
+whichever comes first, and once more at interpreter shutdown.
+
+Other processes (gunicorn workers) append to the same file, so each batch holds
+an exclusive flock while it finds the end of the file, decides on the header
+and writes: the offsets handed to on_flush are then exactly where the lines
+landed, and only the first writer ever emits CSV_HEADER.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock; a single process is the only writer there
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+CSV_HEADER = "ts,city,units,temp,humidity,description,wind_speed\n"
+
+# (row, byte offset, byte length) for every line of a flushed batch
+Written = List[Tuple[Dict[str, Any], int, int]]
+
+
+def format_row(row: Dict[str, Any]) -> str:
+    """One CSV line for a weather row (simple CSV: commas in description become spaces)."""
+    return ",".join([
+        str(row.get("ts", "")),
+        str(row.get("city", "")),
+        str(row.get("units", "")),
+        str(row.get("temp", "")),
+        str(row.get("humidity", "")),
+        str(row.get("description", "")).replace(",", " "),
+        str(row.get("wind_speed", "")),
+    ]) + "\n"
+
+
+@contextmanager
+def _exclusive(f):
+    """Hold an exclusive advisory lock on an open file (no-op without fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class _Barrier:
+    """Queue marker: set once every row enqueued before it has been written."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
+
+class WeatherLogWriter:
+    def __init__(
+        self,
+        path: str,
+        batch_rows: int = 200,
+        flush_ms: int = 250,
+        queue_size: int = 10_000,
+        on_flush: Optional[Callable[[str, Written], None]] = None,
+    ):
+        self.path = os.path.abspath(path)
+        self.batch_rows = max(1, int(batch_rows))
+        self.flush_ms = max(1, int(flush_ms))
+        self.on_flush = on_flush
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._rows_written = 0
+        self._rows_failed = 0
+        self._flushes = 0
+        self._flush_ms_total = 0.0
+        self._flush_ms_last = 0.0
+        self._flush_ms_max = 0.0
+
+    # ---- producer side ------------------------------------------------
+
+    def submit(self, row: Dict[str, Any]) -> None:
+        """Enqueue a row; blocks (backpressure) if the queue is full."""
+        self._ensure_started()
+        self._queue.put(row)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until everything submitted so far is on disk."""
+        if self._thread is None:
+            return True
+        barrier = _Barrier()
+        self._queue.put(barrier)
+        return barrier.done.wait(timeout)
+
+    def close(self) -> None:
+        """Flush and stop the writer thread (registered with atexit)."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            flushes = self._flushes
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_size": self._queue.maxsize,
+                "batch_rows": self.batch_rows,
+                "flush_ms": self.flush_ms,
+                "rows_written": self._rows_written,
+                "rows_failed": self._rows_failed,
+                "flushes": flushes,
+                "flush_latency_ms": {
+                    "last": round(self._flush_ms_last, 3),
+                    "avg": round(self._flush_ms_total / flushes, 3) if flushes else 0.0,
+                    "max": round(self._flush_ms_max, 3),
+                },
+            }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="weather-log-writer", daemon=True)
+                self._thread.start()
+
+    # ---- writer thread ------------------------------------------------
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch: List[Dict[str, Any]] = []
+            barriers: List[_Barrier] = []
+            deadline = time.monotonic() + self.flush_ms / 1000
+            while True:
+                if item is None:
+                    stopping = True
+                elif isinstance(item, _Barrier):
+                    barriers.append(item)
+                else:
+                    batch.append(item)
+                if stopping or barriers or len(batch) >= self.batch_rows:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for b in barriers:
+                b.done.set()
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        t0 = time.perf_counter()
+        written: Written = []
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            lines = [format_row(row).encode("utf-8") for row in batch]
+            with open(self.path, "ab") as f, _exclusive(f):
+                # the end of the file as of now, not as of open(): another process may have appended
+                offset = f.seek(0, os.SEEK_END)
+                chunks = [CSV_HEADER.encode("utf-8")] if offset == 0 else []
+                offset += sum(len(c) for c in chunks)
+                for row, line in zip(batch, lines):
+                    written.append((row, offset, len(line)))
+                    offset += len(line)
+                f.write(b"".join(chunks + lines))
+                f.flush()  # on disk before the lock is released
+        except Exception:
+            log.exception("Failed to write %d weather log rows", len(batch))
+            with self._stats_lock:
+                self._rows_failed += len(batch)
+            return
+
+        elapsed = (time.perf_counter() - t0) * 1000
+        with self._stats_lock:
+            self._rows_written += len(batch)
+            self._flushes += 1
+            self._flush_ms_total += elapsed
+            self._flush_ms_last = elapsed
+            self._flush_ms_max = max(self._flush_ms_max, elapsed)
+
+        if self.on_flush:
+            try:
+                self.on_flush(self.path, written)
+            except Exception:
+                log.exception("Weather log flush hook failed")
+
+
+_writers: Dict[str, WeatherLogWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(path: str, **options: Any) -> WeatherLogWriter:
+    """Return the shared writer for this log path (options apply on first use)."""
+    key = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = WeatherLogWriter(key, **options)
+    return writer
+
+
+@atexit.register
+def _close_all() -> None:
+    for writer in list(_writers.values()):
+        writer.close()
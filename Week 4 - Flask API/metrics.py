@@ -0,0 +1,135 @@
+# metrics.py
+"""
+Tiny in-process Prometheus metrics (text exposition format 0.0.4) for GET /metrics.
+Why: /health uptime and /meta's cache_entries were all we could see; finding
+hot paths under load needs latency distributions per route and per dependency.
+
+Counters and histograms are a dict update under a lock (~1 µs), so they sit on
+the request path. Callback metrics (cache counters, in-flight bulk fetches,
+writer queue depth) are read from the existing stats() methods at scrape time
+instead of being double-counted. No prometheus_client dependency.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple, Union
+
+# seconds; request/upstream/read latencies of this app live between 1 ms and a few s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for values, v in items:
+            yield self.name, dict(zip(self.labels, values)), v
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[Labels, List[float]] = {}  # per-bucket counts..., +Inf count, sum
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for values, series in items:
+            labels = dict(zip(self.labels, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _fmt(bound)}, cumulative
+            yield f"{self.name}_sum", labels, series[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Callback:
+    """Value(s) computed at scrape time: fn() -> number, or {labelvalues tuple: number}."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Union[float, Dict[Labels, float]]],
+                 kind: str = "gauge", labels: Sequence[str] = ()):
+        self.name, self.help, self.fn, self.kind, self.labels = name, help, fn, kind, tuple(labels)
+
+    def samples(self) -> Iterator[Sample]:
+        value = self.fn()
+        if isinstance(value, dict):
+            for values, v in value.items():
+                yield self.name, dict(zip(self.labels, values)), v
+        else:
+            yield self.name, {}, value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, fn: Callable, kind: str = "gauge",
+                 labels: Sequence[str] = ()) -> Callback:
+        return self._add(Callback(name, help, fn, kind, labels))
+
+    def render(self) -> str:
+        lines = []
+        for m in self._metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for name, labels, value in m.samples():
+                if labels:
+                    body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+                    lines.append(f"{name}{{{body}}} {_fmt(value)}")
+                else:
+                    lines.append(f"{name} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
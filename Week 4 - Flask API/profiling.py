@@ -0,0 +1,141 @@
+# profiling.py
+"""
+On-demand profiling of a single request: add ?profile=1 (or ?profile=sample).
+Why: slow history aggregations only show up on production-sized logs, where
+attaching a debugger isn't an option.
+
+    ?profile=1        cProfile (deterministic); saves data/profiles/<ts>-<route>-<tag>.pstats
+                      and answers with the top functions by cumulative time
+    ?profile=pstats   same, but downloads the .pstats file (snakeviz, pstats.Stats)
+    ?profile=sample   wall-clock sampler (every PROFILE_SAMPLE_MS) of the request
+                      thread; answers with collapsed stacks ("a;b;c 12"), ready for
+                      flamegraph.pl / speedscope, and saves them next to the pstats
+
+Off unless PROFILING_ENABLED=1 or PROFILE_ADMIN_TOKEN is set. With a token
+configured, every ?profile request must send it as X-Admin-Token (missing or
+wrong gets 403), whether or not PROFILING_ENABLED is on. The profiler wraps
+app.dispatch_request, so every before_request hook has already run and
+after_request hooks still apply; the view's body is replaced by the profile and
+its status is reported alongside.
+"""
+from __future__ import annotations
+
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+
+from flask import Flask, jsonify, request, send_file
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer; counts identical stacks."""
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    @staticmethod
+    def _label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+def _allowed(enabled: bool, token: Optional[str]) -> Optional[bool]:
+    """True/False for allowed/forbidden; None means profiling is off (ignore the param)."""
+    if token:  # a configured token is always required
+        return hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token)
+    return True if enabled else None
+
+
+def _out_path(out_dir: str, suffix: str) -> str:
+    route = re.sub(r"[^\w.-]+", "_", request.path.strip("/")) or "root"
+    os.makedirs(out_dir, exist_ok=True)
+    # milliseconds + a random tag: profiles of the same route in the same second must not collide
+    stamp = f"{time.strftime('%Y%m%dT%H%M%S')}.{int(time.time() * 1000) % 1000:03d}"
+    return os.path.join(out_dir, f"{stamp}-{route}-{uuid.uuid4().hex[:8]}{suffix}")
+
+
+def init_profiling(app: Flask, enabled: bool = False, token: Optional[str] = None,
+                   out_dir: str = "data/profiles", sample_ms: float = 1.0, top: int = 25) -> None:
+    if not enabled and not token:
+        return  # nothing can turn it on; don't even add the hook
+
+    dispatch = app.dispatch_request
+
+    def _profile_request():
+        mode = request.args.get("profile")
+        if not mode or mode == "0":
+            return dispatch()
+        allowed = _allowed(enabled, token)
+        if allowed is None:
+            return dispatch()
+        if not allowed:
+            return jsonify(error="Invalid admin token for ?profile"), 403
+
+        if mode == "sample":
+            with StackSampler(threading.get_ident(), sample_ms / 1000) as sampler:
+                status = app.make_response(dispatch()).status_code
+            body = sampler.collapsed()
+            with open(_out_path(out_dir, ".collapsed.txt"), "w", encoding="utf-8") as f:
+                f.write(body)
+            resp = app.response_class(body, mimetype="text/plain")
+            resp.headers["X-Profiled-Status"] = str(status)
+            return resp
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            status = app.make_response(dispatch()).status_code
+        finally:
+            profiler.disable()
+        path = _out_path(out_dir, ".pstats")
+        profiler.dump_stats(path)
+        if mode == "pstats":
+            return send_file(os.path.abspath(path), mimetype="application/octet-stream",
+                             as_attachment=True, download_name=os.path.basename(path))
+
+        buf = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buf)
+        stats.sort_stats("cumulative").print_stats(top)
+        return jsonify(
+            profiled_status=status,
+            pstats_file=path,
+            total_calls=stats.total_calls,
+            total_time_ms=round(stats.total_tt * 1000, 3),
+            top=[line for line in buf.getvalue().splitlines() if line.strip()],
+        )
+
+    app.dispatch_request = _profile_request
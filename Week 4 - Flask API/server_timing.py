@@ -0,0 +1,86 @@
+# server_timing.py
+"""
+Per-request phase timings → Server-Timing header (and optionally the access log).
+Why: a slow /weather/<city> or /history didn't say whether the time went to
+the cache, OpenWeather, reading the log, aggregating or encoding JSON.
+
+    with span("read"):
+        records = read_weather_log(...)
+
+Spans with the same name add up (e.g. several cache lookups). The response
+gets `Server-Timing: read;dur=1.234, agg;dur=0.210, json;dur=0.540, total;dur=2.401`
+(milliseconds), which browser dev tools show next to the request.
+
+When disabled, span() hands back one shared no-op context manager: a global
+check and a function call, well under a microsecond. Spans opened outside a
+request (e.g. on bulk executor threads) are ignored.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import nullcontext
+from typing import Dict, Optional
+
+from flask import Flask, g, has_app_context
+
+_enabled = False
+_NOOP = nullcontext()
+
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if not has_app_context():
+            return
+        ms = (time.perf_counter() - self.started) * 1000
+        timings = g.setdefault("server_timing", {})
+        timings[self.name] = timings.get(self.name, 0.0) + ms
+
+
+def span(name: str):
+    """Time a block under `name` for the current request (no-op when disabled)."""
+    return _Span(name) if _enabled else _NOOP
+
+
+def current_timings() -> Optional[Dict[str, float]]:
+    """This request's spans in ms, rounded (None when disabled or nothing was timed)."""
+    if not _enabled or not has_app_context():
+        return None
+    timings = g.get("server_timing")
+    return {k: round(v, 3) for k, v in timings.items()} if timings else None
+
+
+def init_server_timing(app: Flask, enabled: bool = True) -> None:
+    """Turn spans on, time JSON encoding, and add the header after each request."""
+    global _enabled
+    _enabled = enabled
+    if not enabled:
+        return
+
+    provider = app.json
+    encode = provider.response
+
+    def timed_response(*args, **kwargs):
+        with span("json"):
+            return encode(*args, **kwargs)
+
+    provider.response = timed_response
+
+    @app.before_request
+    def _timing_start() -> None:
+        g.server_timing_start = time.perf_counter()
+
+    @app.after_request
+    def _timing_header(response):
+        timings = dict(g.get("server_timing") or {})
+        timings["total"] = (time.perf_counter() - g.get("server_timing_start", time.perf_counter())) * 1000
+        response.headers["Server-Timing"] = ", ".join(f"{k};dur={v:.3f}" for k, v in timings.items())
+        return response
@@ -0,0 +1,40 @@
+import os
+
+# no startup preload: it would build the sidecar/column store next to the real data/weather_log.csv
+os.environ.setdefault("LOG_INDEX_PRELOAD", "0")
+
+import pytest  # noqa: E402
+
+import access_log  # noqa: E402
+import app as app_module  # noqa: E402
+from app import app as flask_app  # noqa: E402
+from city_aliases import CityAliasMap  # noqa: E402
+
+HEADER = "ts,city,units,temp,humidity,description,wind_speed\n"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # every test gets its own data/ dir (paths in app.py are relative)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    # these were opened at import time against the real data/: keep tests out of them
+    monkeypatch.setattr(app_module, "_city_aliases", CityAliasMap(None))
+    monkeypatch.setattr(access_log.access_logger, "disabled", True)
+    flask_app.config.update(TESTING=True)
+    return flask_app.test_client()
+
+
+@pytest.fixture
+def write_log(tmp_path):
+    """Append raw CSV lines to data/weather_log.csv (header on first write)."""
+    def _write(*lines: str):
+        path = tmp_path / "data" / "weather_log.csv"
+        is_new = not path.exists()
+        with path.open("a", encoding="utf-8") as f:
+            if is_new:
+                f.write(HEADER)
+            for line in lines:
+                f.write(line + "\n")
+        return path
+    return _write
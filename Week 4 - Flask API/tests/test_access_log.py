@@ -0,0 +1,34 @@
+import atexit
+import json
+
+from flask import Flask
+
+import access_log
+
+
+def test_access_record_is_structured(client, monkeypatch):
+    seen = []
+    monkeypatch.setattr(access_log.access_logger, "info", lambda msg: seen.append(json.loads(msg)))
+
+    rv = client.get("/square/4")
+    assert rv.status_code == 200
+    rec = seen[-1]
+    assert rec["method"] == "GET" and rec["path"] == "/square/4" and rec["status"] == 200
+    assert rec["duration_ms"] >= 0
+    assert rec["cache_hit"] is None
+
+
+def test_listener_writes_records(tmp_path, monkeypatch):
+    # a listener of our own on tmp paths; the app's one writes to the real data/access.log
+    monkeypatch.setattr(access_log, "_listener", None)
+    monkeypatch.setattr(access_log.access_logger, "handlers", [])
+    app = Flask(__name__)
+    listener = access_log.setup_async_logging(
+        app, access_log_path=str(tmp_path / "access.log"), app_log_path=str(tmp_path / "app.log"))
+    try:
+        access_log.log_access("GET", "/nope", 404, 1.5, None)
+    finally:
+        listener.stop()  # drains the queue
+        atexit.unregister(listener.stop)
+    rec = json.loads((tmp_path / "access.log").read_text(encoding="utf-8").splitlines()[-1])
+    assert rec["path"] == "/nope" and rec["status"] == 404
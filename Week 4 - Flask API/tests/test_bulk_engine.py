@@ -0,0 +1,58 @@
+import time
+
+import app as app_module
+from bulk_engine import BulkFetchEngine, TokenBucket
+
+
+def test_token_bucket_paces_after_burst():
+    now = [0.0]
+    bucket = TokenBucket(rate=10, capacity=2, clock=lambda: now[0])
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert bucket.reserve() == 0.1          # third call waits for one refill
+    now[0] += 1.0
+    assert bucket.reserve() == 0            # refilled (capped at capacity)
+
+
+def test_bulk_fans_out_in_one_wave(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "OPENWEATHER_KEY", "test-key")
+    monkeypatch.setattr(app_module, "_bulk_engine", BulkFetchEngine(concurrency=200))
+    app_module._weather_cache.clear()
+
+    def fake_ow(city, units, api_key):  # gets the resolved key, e.g. "city7"
+        time.sleep(0.2)
+        if city == "nowhere":
+            return None, 404, {"message": "city not found"}
+        return {"city": city.title(), "units": units, "temp": 1.0, "humidity": 1,
+                "description": "x", "wind_speed": 0.0, "ts": "2025-10-07T04:00:00Z"}, 200, None
+
+    monkeypatch.setattr(app_module, "ow_get_weather", fake_ow)
+    cities = [f"City{i}" for i in range(150)] + ["Nowhere"]
+
+    t0 = time.perf_counter()
+    data = client.get("/weather?units=metric&cities=" + ",".join(cities)).get_json()
+    elapsed = time.perf_counter() - t0
+
+    assert elapsed < 1.5                      # ~one round trip, not 25 waves of 6
+    assert set(data) == {"units", "count", "results", "errors"}
+    assert data["count"] == 150
+    assert [r["city"] for r in data["results"]] == cities[:150]
+    assert data["errors"] == [{"city": "Nowhere", "code": 404, "error": {"message": "city not found"}}]
+
+    again = client.get("/weather?units=metric&cities=City1,City2").get_json()
+    assert all(r["cache"] for r in again["results"])
+    app_module.weather_log_writer().flush()
+
+
+def test_single_and_bulk_calls_share_the_key_bucket(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "OPENWEATHER_KEY", "test-key")
+    monkeypatch.setattr(app_module, "_weather_cache", app_module.TTLCache(maxsize=8, ttl=60))
+    bucket = TokenBucket(rate=20, capacity=1)
+    monkeypatch.setattr(app_module, "_ow_bucket", bucket)
+    monkeypatch.setattr(app_module, "_ow_request", lambda city, units, key: (
+        {"city": city, "units": units, "temp": 1.0, "humidity": 1, "description": "x",
+         "wind_speed": 0.0, "ts": "2025-10-07T04:00:00Z"}, 200, None))
+
+    assert client.get("/weather/Oslo").status_code == 200           # the burst token
+    assert client.get("/weather?cities=Lima,Rome").get_json()["count"] == 2
+    assert bucket.waited == 2 and client.get("/meta").get_json()["upstream_rate_limit"]["rate_limited_waits"] == 2
+    app_module.weather_log_writer().flush()
@@ -0,0 +1,28 @@
+import pytest
+
+import app as app_module
+
+pytest.importorskip("matplotlib")
+
+
+def test_png_is_cached_until_city_gets_new_rows(client, write_log):
+    write_log("2025-10-07T04:00:00Z,Seattle,metric,10,70,clouds,2.1",
+              "2025-10-08T04:00:00Z,Seattle,metric,12,60,rain,2.0")
+
+    resp = client.get("/chart/png?city=Seattle&units=imperial")
+    assert resp.status_code == 200 and resp.mimetype == "image/png"
+    assert resp.data.startswith(b"\x89PNG")
+    hits = app_module._chart_pngs.hits
+    assert client.get("/chart/png?city=seattle&units=imperial").data == resp.data
+    assert app_module._chart_pngs.hits == hits + 1
+
+    app_module.append_weather_log({"ts": "2025-10-09T04:00:00Z", "city": "Seattle", "units": "metric",
+                                   "temp": 14, "humidity": 90, "description": "rain", "wind_speed": 1})
+    app_module.weather_log_writer().flush()
+    assert not any(k[0] == "seattle" for k in app_module._chart_pngs._data)
+    assert client.get("/chart/png?city=Seattle&units=imperial").status_code == 200
+
+    assert client.get("/chart/png?city=Paris").status_code == 404
+    assert client.get("/chart/png?city=Seattle&units=kelvin").status_code == 400
+    for bad in ("limit=abc", "limit=0", "points=many"):
+        assert client.get(f"/chart/png?city=Seattle&{bad}").status_code == 400
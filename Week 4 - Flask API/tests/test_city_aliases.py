@@ -0,0 +1,84 @@
+import json
+import os
+import sys
+
+import app as app_module
+from city_aliases import CityAliasMap, has_country_suffix, normalize_city
+from http_utils import make_session
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "bench"))
+from fake_openweather import FakeOpenWeather  # noqa: E402
+
+
+def test_normalize_city():
+    assert normalize_city("  New  York ") == "new york"
+    assert normalize_city("New York, US") == "new york,us"
+    assert normalize_city("St. Louis , us") == "st louis,us"
+    assert normalize_city("Paris, TX, US") == normalize_city("Paris, TX") == "paris,tx,us"
+    assert normalize_city("London, CA") == "london,ca"  # CA is Canada unless ",US" follows
+    assert has_country_suffix("New York, US") and has_country_suffix("Paris, TX, US")
+    assert not has_country_suffix("Seattle,Tokyo") and not has_country_suffix("Paris,FR,US")
+
+
+def test_aliases_share_one_upstream_call_and_persist(client, tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "OPENWEATHER_KEY", "test-key")
+    aliases = CityAliasMap(str(tmp_path / "data" / "city_aliases.json"))
+    monkeypatch.setattr(app_module, "_city_aliases", aliases)
+    app_module._weather_cache.clear()
+    calls = []
+
+    def fake_ow(city, units, api_key):
+        calls.append(city)
+        return {"city": "New York", "units": units, "temp": 18.0, "humidity": 55,
+                "description": "haze", "wind_speed": 3.0, "city_id": 5128581, "country": "US",
+                "ts": "2025-10-08T04:00:00Z"}, 200, None
+
+    monkeypatch.setattr(app_module, "ow_get_weather", fake_ow)
+
+    assert client.get("/weather/New York?units=metric").get_json()["cache"] is False
+    for query in ["new york ", "New York, US", "NYC"]:
+        assert client.get(f"/weather/{query}?units=metric").get_json()["cache"] is True
+    bulk = client.get("/weather?cities=NEW YORK,nyc&units=metric").get_json()
+    assert all(r["cache"] for r in bulk["results"])
+    assert calls == ["new york"]
+
+    aliases.save()
+    saved = json.loads((tmp_path / "data" / "city_aliases.json").read_text())
+    assert saved["new york,us"] == "id:5128581"
+    assert CityAliasMap(str(tmp_path / "data" / "city_aliases.json")).resolve("NYC") == "id:5128581"
+    app_module.weather_log_writer().flush()
+
+
+def test_country_query_does_not_claim_bare_name():
+    aliases = CityAliasMap()
+    aliases.learn("London, CA", {"city": "London", "country": "CA", "city_id": 6058560})
+    assert aliases.resolve("london,ca") == "id:6058560"
+    assert aliases.resolve("London") == "london"
+
+
+def test_seeds_go_upstream_resolved_and_are_never_relearned(tmp_path):
+    path = tmp_path / "aliases.json"
+    path.write_text(json.dumps({"la": "id:1"}))  # e.g. learned before seeds were protected
+    aliases = CityAliasMap(str(path))
+    assert aliases.resolve("LA") == "los angeles,us"
+    aliases.learn("LA", {"city": "La", "country": "XX", "city_id": 42})
+    assert aliases.resolve("la") == "los angeles,us"
+
+
+def test_cold_nyc_is_fetched_as_new_york(client, monkeypatch):
+    fake = FakeOpenWeather(latency_ms=0)
+    monkeypatch.setitem(app_module.app.config, "OPENWEATHER_URL", fake.start())
+    monkeypatch.setitem(app_module.app.config, "OPENWEATHER_KEY", "test-key")
+    monkeypatch.setattr(app_module, "_city_aliases", CityAliasMap(None))
+    monkeypatch.setattr(app_module, "_http", make_session(total=0))
+    try:
+        monkeypatch.setattr(app_module, "_weather_cache", app_module.TTLCache(maxsize=8, ttl=60))
+        body = client.get("/weather/NYC?units=metric").get_json()
+        assert (body["city"], body["country"], body["cache"]) == ("New York", "US", False)
+
+        monkeypatch.setattr(app_module, "_weather_cache", app_module.TTLCache(maxsize=8, ttl=60))
+        assert client.get("/weather/nyc").status_code == 200  # learned: asked for by id
+        assert fake.queries == ["new york,us", f"id:{body['city_id']}"]
+    finally:
+        fake.stop()
+        app_module.weather_log_writer().flush()
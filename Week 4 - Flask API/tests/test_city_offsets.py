@@ -0,0 +1,64 @@
+from app import append_weather_log, weather_log_writer
+from city_offsets import CityOffsetIndex
+from log_index import get_index
+
+
+def test_build_and_read_city(client, write_log):
+    path = write_log("2025-10-07T04:00:00Z,Seattle,metric,13,74,clouds,2.1",
+                     "2025-10-07T05:00:00Z,Tokyo,metric,20,60,clear,1.0",
+                     "2025-10-07T06:00:00Z,Seattle,metric,14,70,rain,2.0")
+    idx = CityOffsetIndex(str(path))
+    assert idx.build() == 3
+    assert [r["temp"] for r in idx.read_city("SEATTLE")] == [13.0, 14.0]
+    assert [r["temp"] for r in idx.read_city("seattle", limit=1)] == [14.0]
+
+    # rows appended by someone else are caught up on the next read
+    write_log("2025-10-07T07:00:00Z,Tokyo,metric,21,61,clear,1.0")
+    assert [r["temp"] for r in idx.read_city("tokyo")] == [20.0, 21.0]
+
+
+def test_append_keeps_sidecar_current(client, write_log):
+    path = write_log("2025-10-07T04:00:00Z,Seattle,metric,13,74,clouds,2.1")
+    CityOffsetIndex(str(path)).build()
+
+    append_weather_log({"ts": "2025-10-08T04:00:00Z", "city": "Paris", "units": "metric",
+                        "temp": 9.5, "humidity": 80, "description": "fog, light", "wind_speed": 1})
+    weather_log_writer().flush()
+
+    # cold index -> /history?city= is answered from the sidecar
+    assert not get_index(str(path)).loaded
+    data = client.get("/history?city=paris").get_json()
+    assert data["count"] == 1
+    assert data["records"][0]["description"] == "fog  light"
+    assert not get_index(str(path)).loaded
+
+
+def test_preload_creates_sidecar_and_connections_are_per_thread(client, write_log):
+    import app as app_module
+    path = write_log("2025-10-07T04:00:00Z,Seattle,metric,13,74,clouds,2.1")
+    app_module._warm_log_index()
+    idx = app_module.get_offsets(str(path))
+    assert idx.exists()
+
+    conn = idx._conn()
+    idx.read_city_after("seattle", 0, 10)
+    assert idx._conn() is conn  # reused, not reopened (and re-schema'd) per call
+
+
+def test_two_workers_catching_up_index_each_row_once(client, write_log):
+    import threading
+    path = write_log("2025-10-07T04:00:00Z,Seattle,metric,0,70,clouds,2.1")
+    workers = [CityOffsetIndex(str(path)), CityOffsetIndex(str(path))]  # e.g. two gunicorn processes
+    workers[0].build()
+    write_log(*[f"2025-10-07T05:00:00Z,Seattle,metric,{i},70,clouds,2.1" for i in range(1, 5001)])
+
+    barrier, counts = threading.Barrier(2), []
+    def catch_up(idx):
+        barrier.wait()
+        counts.append(len(idx.read_city("seattle")))
+    threads = [threading.Thread(target=catch_up, args=(w,)) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counts == [5001, 5001]
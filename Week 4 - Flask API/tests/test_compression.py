@@ -0,0 +1,47 @@
+import gzip
+import json
+
+import pytest
+
+from app import app as flask_app
+
+
+def _rows(n):
+    return (f"2025-10-07T{i % 24:02d}:00:00Z,Seattle,metric,{i % 30},50,broken clouds,1.0" for i in range(n))
+
+
+def test_gzip_negotiated_above_threshold(client, write_log):
+    write_log(*_rows(200))
+
+    plain = client.get("/history?limit=200")
+    assert "Content-Encoding" not in plain.headers and "Accept-Encoding" in plain.headers["Vary"]
+
+    packed = client.get("/history?limit=200", headers={"Accept-Encoding": "gzip"})
+    assert packed.headers["Content-Encoding"] == "gzip"
+    assert len(packed.data) < len(plain.data) // 4
+    assert json.loads(gzip.decompress(packed.data)) == plain.get_json()
+
+    # the encoded ETag still revalidates
+    etag = packed.headers["ETag"]
+    assert etag.endswith('-gzip"')
+    assert client.get("/history?limit=200", headers={"Accept-Encoding": "gzip",
+                                                   "If-None-Match": etag}).status_code == 304
+
+    small = client.get("/history?limit=1", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+
+def test_streamed_bodies_compress_chunkwise(client, write_log):
+    write_log(*_rows(50))
+    resp = client.get("/history?limit=0&format=ndjson", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip" and "Content-Length" not in resp.headers
+    lines = gzip.decompress(resp.data).decode().splitlines()
+    assert len(lines) == 51 and json.loads(lines[-1])["summary"]["count"] == 50
+
+
+def test_orjson_provider_keeps_output_shape():
+    pytest.importorskip("orjson")
+    with flask_app.test_request_context():
+        body = flask_app.json.response({"b": 1, "a": [1.5, None, "é"]}).get_data()
+    assert json.loads(body) == {"a": [1.5, None, "é"], "b": 1}
+    assert type(flask_app.json).__name__ == "OrjsonProvider"
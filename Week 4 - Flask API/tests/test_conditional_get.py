@@ -0,0 +1,32 @@
+from app import append_weather_log, weather_log_writer
+
+
+def test_history_revalidates_until_a_row_is_appended(client, write_log):
+    write_log("2025-10-07T04:00:00Z,Seattle,metric,10,70,clouds,2.1")
+
+    first = client.get("/history?city=Seattle")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+
+    again = client.get("/history?city=Seattle", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.data == b""
+    assert again.headers["ETag"] == etag
+
+    # different query -> different validator
+    other = client.get("/history?city=Seattle&limit=1", headers={"If-None-Match": etag})
+    assert other.status_code == 200 and other.headers["ETag"] != etag
+
+    since = first.headers["Last-Modified"]
+    assert client.get("/history/stats", headers={"If-Modified-Since": since}).status_code == 304
+
+    append_weather_log({"ts": "2025-10-08T04:00:00Z", "city": "Seattle", "units": "metric",
+                        "temp": 12, "humidity": 60, "description": "rain", "wind_speed": 1})
+    weather_log_writer().flush()
+    fresh = client.get("/history?city=Seattle", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.get_json()["count"] == 2
+
+
+def test_errors_carry_no_validators(client, write_log):
+    write_log("2025-10-07T04:00:00Z,Seattle,metric,10,70,clouds,2.1")
+    resp = client.get("/history/stats?city=Paris")
+    assert resp.status_code == 404 and "ETag" not in resp.headers
@@ -0,0 +1,54 @@
+from app import append_weather_log, weather_log_writer
+from daily_rollups import DailyRollups
+
+
+def test_stats_and_daily_from_rollups(client, write_log):
+    write_log("2025-10-07T04:00:00Z,Seattle,metric,10,70,clouds,2.1",
+              "2025-10-07T16:00:00Z,Seattle,imperial,60,80,clouds,2.1",
+              "2025-10-08T04:00:00Z,Seattle,metric,12,,rain,2.0",
+              "2025-10-08T05:00:00Z,Tokyo,metric,20,60,clear,1.0")
+
+    stats = client.get("/history/stats?city=Seattle").get_json()
+    assert stats == {"city": "Seattle", "samples": 3, "avg_temp": 27.33,
+                     "min_temp": 10.0, "max_temp": 60.0, "avg_humidity": 75.0}
+
+    append_weather_log({"ts": "2025-10-09T04:00:00Z", "city": "Seattle", "units": "metric",
+                        "temp": 14, "humidity": 90, "description": "rain", "wind_speed": 1})
+    weather_log_writer().flush()
+    days = client.get("/history/daily?city=seattle&limit=2").get_json()["days"]
+    assert [(d["date"], d["count"], d["avg_temp"]) for d in days] == [
+        ("2025-10-08", 1, 12.0), ("2025-10-09", 1, 14.0)]
+    assert days[0]["avg_humidity"] is None
+
+    assert client.get("/history/stats?city=Paris").status_code == 404
+
+
+def test_rebuild_matches_incremental(client, write_log):
+    path = write_log("2025-10-07T04:00:00Z,Seattle,metric,10,70,clouds,2.1")
+    store = DailyRollups(str(path))
+    assert store.rebuild() == 1
+    write_log("2025-10-07T05:00:00Z,Seattle,metric,14,72,clouds,2.1")
+    before = store.daily("seattle")
+    assert store.rebuild() == 1
+    assert store.daily("seattle") == before == [{
+        "date": "2025-10-07", "count": 2, "avg_temp": 12.0,
+        "min_temp": 10.0, "max_temp": 14.0, "avg_humidity": 71.0}]
+
+
+def test_two_workers_catching_up_fold_each_row_once(client, write_log):
+    import threading
+    path = write_log("2025-10-07T04:00:00Z,Seattle,metric,0,70,clouds,2.1")
+    workers = [DailyRollups(str(path)), DailyRollups(str(path))]  # e.g. two gunicorn processes
+    workers[0].rebuild()
+    write_log(*[f"2025-10-07T05:00:00Z,Seattle,metric,{i},70,clouds,2.1" for i in range(1, 5001)])
+
+    barrier, samples = threading.Barrier(2), []
+    def catch_up(store):
+        barrier.wait()
+        samples.append(store.stats("seattle")["samples"])
+    threads = [threading.Thread(target=catch_up, args=(w,)) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert samples == [5001, 5001]
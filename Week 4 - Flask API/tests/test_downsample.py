@@ -0,0 +1,32 @@
+import json
+import math
+import urllib.parse
+
+from downsample import lttb
+
+
+def test_lttb_keeps_ends_and_peaks():
+    xs = list(range(1000))
+    ys = [math.sin(x / 50) for x in xs]
+    ys[500] = 10.0  # a spike must survive
+    keep = lttb(xs, ys, 50)
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 999 and 500 in keep
+    assert keep == sorted(keep)
+    assert lttb(xs[:10], ys[:10], 50) == list(range(10))
+
+
+def test_chart_url_respects_points_budget(client, write_log):
+    write_log(*(f"2025-10-{1 + i // 24:02d}T{i % 24:02d}:00:00Z,Seattle,metric,{i % 17},50,clear,1.0"
+                for i in range(400)))
+
+    body = client.get("/chart?city=Seattle&limit=400&points=40").get_json()
+    assert body["count"] == 400 and body["points"] == 40
+    cfg = json.loads(urllib.parse.unquote_plus(body["chart_url"].split("?c=", 1)[1]))
+    data = cfg["data"]["datasets"][0]["data"]
+    assert len(data) == len(cfg["data"]["labels"]) == 40
+    assert max(data) == 16
+
+    resp = client.get("/chart/view?city=Seattle&limit=400&points=20")
+    assert resp.status_code == 302 and len(resp.location) < len(body["chart_url"])
+    assert client.get("/chart?city=Seattle&points=many").status_code == 400
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+import app as app_module
+from city_aliases import CityAliasMap
+from http_utils import make_session
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "bench"))
+from fake_openweather import FakeOpenWeather  # noqa: E402
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    servers = []
+
+    def _start(**options):
+        server = FakeOpenWeather(latency_ms=0, **options)
+        monkeypatch.setitem(app_module.app.config, "OPENWEATHER_URL", server.start())
+        servers.append(server)
+        return server
+
+    monkeypatch.setitem(app_module.app.config, "OPENWEATHER_KEY", "bench")
+    # the app's alias map persists to the real data/city_aliases.json; fake ids must not land there
+    monkeypatch.setattr(app_module, "_city_aliases", CityAliasMap(None))
+    monkeypatch.setattr(app_module, "_weather_cache", app_module.TTLCache(maxsize=8, ttl=60))
+    monkeypatch.setattr(app_module, "_http", make_session(total=0))  # surface 429/500 as-is
+    yield _start
+    for server in servers:
+        server.stop()
+
+
+def test_weather_route_talks_to_the_fake(client, fake):
+    server = fake()
+    body = client.get("/weather/oslo,no?units=imperial").get_json()
+    assert body["city"] == "Oslo" and body["country"] == "NO"
+    assert client.get("/weather/oslo,no?units=imperial").get_json()["temp"] == body["temp"]  # cached
+    assert server.counts == {"requests": 1, "ok": 1, "errors": 0, "rate_limited": 0}
+
+
+def test_error_rate_and_rate_limit(client, fake):
+    fake(error_rate=1.0)
+    assert client.get("/weather/Paris").status_code == 500
+
+    limited = fake(rate_limit=1)
+    assert client.get("/weather/Rome").status_code == 200
+    assert client.get("/weather/Lima").status_code == 429
+    assert limited.counts["rate_limited"] == 1
@@ -0,0 +1,35 @@
+import os
+
+from history_pages import encode_cursor
+
+
+def _walk(client, query):
+    pages, after = [], ""
+    while True:
+        page = client.get(f"/history?after={after}&{query}").get_json()
+        pages.append([(r["city"], r["temp"]) for r in page["records"]])
+        after = page["next"]
+        if not page["has_more"]:
+            return pages, after
+
+
+def test_walk_history_by_cursor(client, write_log):
+    path = write_log(*(f"2025-10-07T0{i}:00:00Z,{'Seattle' if i % 2 else 'Tokyo'},metric,{i},50,clear,1.0"
+                       for i in range(7)))
+
+    pages, last = _walk(client, "limit=3")
+    assert pages == [[("Tokyo", 0.0), ("Seattle", 1.0), ("Tokyo", 2.0)],
+                     [("Seattle", 3.0), ("Tokyo", 4.0), ("Seattle", 5.0)],
+                     [("Tokyo", 6.0)]]
+
+    city_pages, city_last = _walk(client, "limit=2&city=seattle")
+    assert city_pages == [[("Seattle", 1.0), ("Seattle", 3.0)], [("Seattle", 5.0)]]
+
+    # the final cursor picks up rows appended later
+    write_log("2025-10-07T07:00:00Z,Seattle,metric,7,50,clear,1.0")
+    assert client.get(f"/history?after={last}").get_json()["records"][0]["temp"] == 7.0
+    assert client.get(f"/history?after={city_last}&city=Seattle").get_json()["count"] == 1
+
+    stale = encode_cursor(os.stat(path).st_ino + 1, 0)
+    assert client.get(f"/history?after={stale}").status_code == 400
+    assert client.get("/history?after=not-a-cursor").status_code == 400
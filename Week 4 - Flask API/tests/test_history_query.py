@@ -0,0 +1,58 @@
+import numpy as np
+
+
+def test_group_by_city_and_day_with_percentiles(client, write_log):
+    write_log("2025-10-06T04:00:00Z,Seattle,metric,10,70,clouds,2.0",
+              "2025-10-06T16:00:00Z,Seattle,metric,14,80,clouds,4.0",
+              "2025-10-06T18:00:00Z,Seattle,metric,,90,clouds,",
+              "2025-10-07T04:00:00Z,Seattle,metric,12,60,rain,3.0",
+              "2025-10-07T05:00:00Z,Tokyo,metric,20,60,clear,1.0",
+              "2025-10-13T05:00:00Z,Tokyo,metric,22,50,clear,1.0")
+
+    res = client.get("/history/query?group_by=city,day&aggs=count,mean,min,max,stddev,p50,p95"
+                     "&end=2025-10-08").get_json()
+    assert res["rows_matched"] == 5
+    first = res["groups"][0]
+    assert (first["city"], first["day"], first["samples"]) == ("Seattle", "2025-10-06", 3)
+    temps = np.array([10.0, 14.0])
+    assert first["temp"] == {
+        "count": 2, "mean": 12.0, "min": 10.0, "max": 14.0,
+        "stddev": round(float(temps.std()), 2),
+        "p50": 12.0, "p95": round(float(np.percentile(temps, 95)), 2),
+    }
+    assert [(g["city"], g["day"]) for g in res["groups"][1:]] == [
+        ("Seattle", "2025-10-07"), ("Tokyo", "2025-10-07")]
+
+    weekly = client.get("/history/query?group_by=week&metrics=humidity,wind_speed&aggs=count,p99"
+                        "&start=2025-10-06T00:00:00Z").get_json()["groups"]
+    assert [(g["week"], g["samples"]) for g in weekly] == [("2025-10-06", 5), ("2025-10-13", 1)]
+    assert weekly[0]["wind_speed"]["count"] == 4
+    assert weekly[0]["humidity"]["p99"] == round(float(np.percentile([70, 80, 90, 60, 60], 99)), 2)
+
+
+def test_rejects_unknown_aggregates(client, write_log):
+    write_log("2025-10-06T04:00:00Z,Seattle,metric,10,70,clouds,2.0")
+    assert client.get("/history/query?aggs=median").status_code == 400
+    assert client.get("/history/query?group_by=day,hour").status_code == 400
+    assert client.get("/history/query?start=yesterday").status_code == 400
+
+
+def test_csv_backend_builds_the_store_on_first_query(client, write_log, tmp_path, monkeypatch):
+    import shutil
+    import app as app_module
+    monkeypatch.setitem(app_module.app.config, "HISTORY_BACKEND", "csv")
+    write_log("2025-10-06T04:00:00Z,Seattle,metric,10,70,clouds,2.0")
+    store = tmp_path / "data" / "weather_log.cols"
+    app_module._warm_log_index()
+    assert not store.exists()  # no third parse/store unless asked for
+
+    assert client.get("/history/query?aggs=count").get_json()["rows_matched"] == 1
+    app_module.append_weather_log({"ts": "2025-10-07T04:00:00Z", "city": "Seattle", "units": "metric",
+                                   "temp": 12, "humidity": 60, "description": "rain", "wind_speed": 3})
+    app_module.weather_log_writer().flush()  # the flush hook appends to the store
+    assert client.get("/history/query?aggs=count").get_json()["rows_matched"] == 2
+
+    shutil.rmtree(store)
+    monkeypatch.setitem(app_module.app.config, "HISTORY_QUERY_PRELOAD", True)
+    app_module._warm_log_index()
+    assert (store / "meta.json").exists()
@@ -0,0 +1,38 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app import app as flask_app
+
+ROWS = ("2025-10-07T04:00:00Z,Seattle,metric,10,70,clouds,2.1",
+        "2025-10-07T05:00:00Z,Tokyo,metric,20,60,clear,1.0",
+        "2025-10-07T06:00:00Z,Seattle,metric,14,,rain,2.0")
+
+
+@pytest.mark.parametrize("backend", ["csv", "columnar"])
+def test_ndjson_stream_matches_json(client, write_log, monkeypatch, backend):
+    monkeypatch.setitem(flask_app.config, "HISTORY_BACKEND", backend)
+    write_log(*ROWS)
+
+    whole = client.get("/history?city=seattle&limit=0").get_json()
+    resp = client.get("/history?city=seattle&limit=0&format=ndjson")
+    assert resp.is_streamed and resp.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    *records, trailer = lines
+    assert records == whole.pop("records")
+    assert trailer == {"summary": whole}
+    assert trailer["summary"]["count"] == 2
+
+
+def test_csv_stream_and_errors(client, write_log):
+    write_log(*ROWS)
+    text = client.get("/history?limit=2&format=csv").get_data(as_text=True)
+    body, trailer = text.rsplit("# ", 1)
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert [(r["city"], r["humidity"]) for r in rows] == [("Tokyo", "60.0"), ("Seattle", "")]
+    assert json.loads(trailer)["summary"]["avg_temp"] == 17.0
+
+    assert client.get("/history?city=Paris&format=ndjson").status_code == 404
+    assert client.get("/history?format=xml").status_code == 400
@@ -0,0 +1,58 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_utils import make_session, pool_stats
+
+
+@pytest.fixture
+def server():
+    hits = {"n": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_GET(self):
+            hits["n"] += 1
+            status = 503 if self.path == "/flaky" and hits["n"] == 1 else 200
+            if self.path == "/throttled" and hits["n"] == 1:
+                status = 429
+            body = b'{"ok": true}'
+            self.send_response(status)
+            if status == 429:
+                self.send_header("Retry-After", "60")
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+def test_connections_are_reused(server):
+    s = make_session()
+    for _ in range(3):
+        assert s.get(server + "/ok", timeout=5).status_code == 200
+    stats = pool_stats(s)
+    assert stats["connections_created"] == 1
+    assert stats["connections_reused"] == 2
+
+
+def test_retries_transient_5xx(server):
+    s = make_session(backoff=0)
+    assert s.get(server + "/flaky", timeout=5).status_code == 200
+
+
+def test_long_retry_after_is_capped(server):
+    s = make_session(backoff=0, max_retry_after=0.2)
+    t0 = time.perf_counter()
+    assert s.get(server + "/throttled", timeout=5).status_code == 200
+    assert time.perf_counter() - t0 < 2  # not the 60 s the server asked for
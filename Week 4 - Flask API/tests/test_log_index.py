@@ -0,0 +1,46 @@
+import os
+
+from log_index import get_index
+
+
+def test_history_reads_only_new_rows(client, write_log):
+    write_log("2025-10-07T04:17:15Z,Seattle,metric,13,74,clouds,2.1",
+              "2025-10-07T05:17:15Z,Tokyo,metric,20,60,clear,1.0")
+    rv = client.get("/history?city=seattle")
+    assert rv.status_code == 200
+    assert rv.get_json()["count"] == 1
+
+    write_log("2025-10-08T04:17:15Z,Seattle,metric,15,70,rain,3.0")
+    data = client.get("/history?city=Seattle").get_json()
+    assert data["count"] == 2
+    assert data["max_temp"] == 15.0
+    assert client.get("/history/stats").get_json()["samples"] == 3
+
+
+def test_truncated_log_is_reparsed(client, write_log):
+    path = write_log("2025-10-07T04:17:15Z,Seattle,metric,13,74,clouds,2.1",
+                     "2025-10-07T05:17:15Z,Seattle,metric,14,74,clouds,2.1")
+    index = get_index(str(path))
+    index.refresh()
+    assert len(index.select()) == 2
+
+    os.remove(path)
+    write_log("2025-10-09T04:17:15Z,Paris,metric,9,80,fog,1.0")
+    index.refresh()
+    rows = index.select()
+    assert [r["city"] for r in rows] == ["Paris"]
+    assert rows[0]["temp"] == 9.0
+
+
+def test_partial_line_waits_for_newline(client, write_log):
+    path = write_log("2025-10-07T04:17:15Z,Seattle,metric,13,74,clouds,2.1")
+    with path.open("a", encoding="utf-8") as f:
+        f.write("2025-10-08T04:17:15Z,Seat")
+    index = get_index(str(path))
+    index.refresh()
+    assert len(index.select()) == 1
+
+    with path.open("a", encoding="utf-8") as f:
+        f.write("tle,metric,15,70,rain,3.0\n")
+    index.refresh()
+    assert [r["temp"] for r in index.select(city="seattle")] == [13.0, 15.0]
@@ -0,0 +1,78 @@
+import threading
+
+from log_writer import WeatherLogWriter
+
+
+def _row(i):
+    return {"ts": f"2025-10-07T04:00:{i:02d}Z", "city": "Seattle", "units": "metric",
+            "temp": i, "humidity": 50, "description": "clouds", "wind_speed": 1}
+
+
+def test_concurrent_rows_are_batched_without_interleaving(tmp_path):
+    path = tmp_path / "data" / "weather_log.csv"
+    flushed = []
+    writer = WeatherLogWriter(str(path), batch_rows=25, flush_ms=50,
+                              on_flush=lambda p, written: flushed.append(written))
+
+    threads = [threading.Thread(target=lambda k=k: [writer.submit(_row(k * 10 + i)) for i in range(10)])
+               for k in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert writer.flush(timeout=5)
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "ts,city,units,temp,humidity,description,wind_speed"
+    assert sorted(int(line.split(",")[3]) for line in lines[1:]) == list(range(60))
+
+    stats = writer.stats()
+    assert stats["rows_written"] == 60 and stats["queue_depth"] == 0
+    assert stats["flushes"] == len(flushed) < 60
+
+    # offsets handed to the flush hook point at the exact lines
+    raw = path.read_bytes()
+    row, offset, length = flushed[-1][-1]
+    assert raw[offset:offset + length].decode().startswith(row["ts"])
+    writer.close()
+
+
+def test_close_flushes_pending_rows(tmp_path):
+    path = tmp_path / "weather_log.csv"
+    writer = WeatherLogWriter(str(path), batch_rows=1000, flush_ms=60_000)
+    writer.submit(_row(1))
+    writer.close()
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_two_writers_share_the_file(tmp_path, monkeypatch):
+    import time
+    import log_writer
+    format_row = log_writer.format_row
+    # slow formatting widens any gap between finding the end of the file and writing to it
+    monkeypatch.setattr(log_writer, "format_row", lambda row: time.sleep(0.001) or format_row(row))
+    path = tmp_path / "weather_log.csv"
+    flushed = []
+    # e.g. two gunicorn workers, each with its own writer on the same log
+    writers = [WeatherLogWriter(str(path), batch_rows=5, flush_ms=1,
+                                on_flush=lambda p, written: flushed.extend(written)) for _ in range(2)]
+    barrier = threading.Barrier(2)
+
+    def produce(w, k):
+        barrier.wait()
+        for i in range(200):
+            w.submit(_row(k * 1000 + i))
+        w.flush(timeout=10)
+    threads = [threading.Thread(target=produce, args=(w, k)) for k, w in enumerate(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    raw = path.read_bytes()
+    assert raw.count(b"ts,city") == 1  # only the first batch writes the header
+    assert len(flushed) == 400
+    for row, offset, length in flushed:
+        assert raw[offset:offset + length].split(b",")[3] == str(row["temp"]).encode()
+    for w in writers:
+        w.close()
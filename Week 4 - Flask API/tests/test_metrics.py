@@ -0,0 +1,42 @@
+import requests
+
+import app as app_module
+from metrics import Registry
+
+
+def test_histogram_exposition():
+    reg = Registry()
+    h = reg.histogram("lat_seconds", "latency", ("route",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 3.0):
+        h.observe(v, "/x")
+    reg.counter("errors_total", "errors", ("status",)).inc("502")
+    text = reg.render()
+    assert 'lat_seconds_bucket{route="/x",le="0.1"} 1' in text
+    assert 'lat_seconds_bucket{route="/x",le="1.0"} 2' in text
+    assert 'lat_seconds_bucket{route="/x",le="+Inf"} 3' in text
+    assert 'lat_seconds_count{route="/x"} 3' in text
+    assert 'lat_seconds_sum{route="/x"} 3.55' in text
+    assert "# TYPE errors_total counter" in text and 'errors_total{status="502"} 1' in text
+
+
+class _DownSession:
+    def get(self, *args, **kwargs):
+        raise requests.exceptions.ConnectionError("boom")
+
+
+def test_metrics_endpoint_reports_routes_upstream_and_cache(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "OPENWEATHER_KEY", "test-key")
+    monkeypatch.setattr(app_module, "_http", _DownSession())
+    before = app_module.UPSTREAM_ERRORS._values.get(("502",), 0)
+
+    client.get("/square/4")
+    assert client.get("/weather/Nowhere").status_code == 502
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200 and resp.mimetype == "text/plain"
+    text = resp.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{route="/square/<int:n>",method="GET",status="200"}' in text
+    assert app_module.UPSTREAM_ERRORS._values[("502",)] == before + 1
+    assert 'openweather_request_duration_seconds_count{status="502"}' in text
+    assert 'weather_cache_requests_total{result="miss"}' in text
+    assert "bulk_fetch_in_flight 0" in text
@@ -0,0 +1,67 @@
+import os
+import pstats
+import time
+
+from flask import Flask, g, jsonify
+
+from profiling import init_profiling
+
+
+def _slow_sum(n):
+    time.sleep(0.02)
+    return sum(range(n))
+
+
+def _app(tmp_path, **options):
+    app = Flask(__name__)
+    init_profiling(app, out_dir=str(tmp_path / "profiles"), **options)
+
+    @app.before_request
+    def _registered_after_profiling():
+        g.n = 1000
+
+    @app.route("/work")
+    def work():
+        return jsonify(total=_slow_sum(g.n))
+
+    return app.test_client()
+
+
+def test_cprofile_summary_and_pstats_download(tmp_path):
+    client = _app(tmp_path, enabled=True)
+    assert client.get("/work").get_json() == {"total": 499500}
+
+    body = client.get("/work?profile=1").get_json()
+    assert body["profiled_status"] == 200 and body["total_calls"] > 0
+    assert any("_slow_sum" in line for line in body["top"])
+    assert "_slow_sum" in str(pstats.Stats(body["pstats_file"]).stats)
+
+    raw = client.get("/work?profile=pstats")
+    assert raw.mimetype == "application/octet-stream" and raw.data
+
+    # back-to-back profiles of one route (same second) each keep their own file
+    paths = {client.get("/work?profile=1").get_json()["pstats_file"] for _ in range(3)}
+    assert len(paths) == 3 and all(os.path.exists(p) for p in paths)
+
+
+def test_sampler_returns_collapsed_stacks(tmp_path):
+    client = _app(tmp_path, enabled=True, sample_ms=1)
+    resp = client.get("/work?profile=sample")
+    assert resp.headers["X-Profiled-Status"] == "200"
+    stack, count = resp.get_data(as_text=True).splitlines()[0].rsplit(" ", 1)
+    assert "work (" in stack and "_slow_sum (" in stack and int(count) >= 1
+    assert any(f.endswith(".collapsed.txt") for f in os.listdir(tmp_path / "profiles"))
+
+
+def test_admin_token_gate(tmp_path):
+    client = _app(tmp_path, token="s3cret")
+    assert client.get("/work?profile=1").status_code == 403
+    assert client.get("/work?profile=1", headers={"X-Admin-Token": "nope"}).status_code == 403
+    assert "top" in client.get("/work?profile=1", headers={"X-Admin-Token": "s3cret"}).get_json()
+
+    both = _app(tmp_path, enabled=True, token="s3cret")  # a configured token is always required
+    assert both.get("/work?profile=1").status_code == 403
+    assert "top" in both.get("/work?profile=1", headers={"X-Admin-Token": "s3cret"}).get_json()
+
+    off = _app(tmp_path)  # neither flag nor token: the param is ignored
+    assert off.get("/work?profile=1").get_json() == {"total": 499500}
@@ -0,0 +1,34 @@
+import json
+
+import access_log
+import app as app_module
+import server_timing
+
+
+def _spans(resp):
+    return {part.split(";")[0].strip() for part in resp.headers["Server-Timing"].split(",")}
+
+
+def test_history_and_weather_phases(client, write_log, monkeypatch):
+    write_log("2025-10-07T04:00:00Z,Seattle,metric,10,70,clouds,2.1")
+    assert {"read", "agg", "json", "total"} <= _spans(client.get("/history?city=Seattle"))
+
+    monkeypatch.setitem(app_module.app.config, "OPENWEATHER_KEY", "test-key")
+    monkeypatch.setattr(app_module, "_weather_cache", app_module.TTLCache(maxsize=8, ttl=60))
+    payload = {"city": "Oslo", "units": "metric", "temp": 5.0, "humidity": 80,
+               "description": "snow", "wind_speed": 3.0, "ts": "2025-10-07T04:00:00+00:00"}
+    monkeypatch.setattr(app_module, "_ow_request", lambda city, units, key: (dict(payload), 200, None))
+    assert {"cache", "upstream", "json"} <= _spans(client.get("/weather/Oslo"))
+    hit = client.get("/weather/Oslo")
+    assert "upstream" not in _spans(hit) and "cache" in _spans(hit)
+
+
+def test_spans_in_access_log_and_noop_when_disabled(client, monkeypatch):
+    seen = []
+    monkeypatch.setattr(access_log.access_logger, "info", lambda msg: seen.append(json.loads(msg)))
+    monkeypatch.setitem(app_module.app.config, "SERVER_TIMING_LOG", True)
+    client.get("/history")
+    assert "read" in seen[-1]["timings"]
+
+    monkeypatch.setattr(server_timing, "_enabled", False)
+    assert server_timing.span("read") is server_timing.span("agg") is server_timing._NOOP
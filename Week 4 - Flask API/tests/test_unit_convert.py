@@ -0,0 +1,36 @@
+import app as app_module
+from unit_convert import to_units
+
+
+def test_conversions_round_trip():
+    metric = {"city": "Seattle", "units": "metric", "temp": 12.8, "wind_speed": 2.15, "humidity": 74}
+    imperial = to_units(metric, "imperial")
+    assert (imperial["temp"], imperial["wind_speed"]) == (55.04, 4.81)
+    assert to_units(metric, "standard")["temp"] == 285.95
+    assert to_units(imperial, "metric")["temp"] == 12.8
+    assert metric["units"] == "metric"  # input untouched
+
+
+def test_one_upstream_call_serves_every_unit_system(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "OPENWEATHER_KEY", "test-key")
+    app_module._weather_cache.clear()
+    calls = []
+
+    def fake_ow(city, units, api_key):
+        calls.append(units)
+        return {"city": "Tokyo", "units": units, "temp": 20.0, "humidity": 60,
+                "description": "clear", "wind_speed": 1.0, "ts": "2025-10-08T04:00:00Z"}, 200, None
+
+    monkeypatch.setattr(app_module, "ow_get_weather", fake_ow)
+
+    first = client.get("/weather/Tokyo?units=imperial").get_json()
+    second = client.get("/weather/Tokyo?units=metric").get_json()
+    bulk = client.get("/weather?cities=tokyo&units=standard").get_json()
+
+    assert calls == ["metric"]
+    assert (first["units"], first["temp"], first["cache"]) == ("imperial", 68.0, False)
+    assert (second["temp"], second["cache"]) == (20.0, True)
+    assert bulk["results"][0]["temp"] == 293.15
+
+    app_module.weather_log_writer().flush()
+    assert ",metric,20.0," in open("data/weather_log.csv", encoding="utf-8").read()
@@ -0,0 +1,80 @@
+from weather_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache(maxsize=2, ttl=60, clock=FakeClock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1      # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (2, 1, 1, 2)
+
+
+def test_expiry_and_sweep():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, sweep_interval=30, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    clock.now += 61
+    assert cache.get("a") is None
+    assert len(cache) == 1           # "b" is expired but not yet swept
+    cache.set("c", 3)                # past sweep_interval -> sweeps "b"
+    assert len(cache) == 1
+    assert cache.stats()["expirations"] == 2
+
+
+def test_stale_window():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, stale_ttl=30, clock=clock)
+    cache.set("a", 1)
+    clock.now += 70
+    assert cache.get("a") is None                # plain reads never see stale data
+    assert cache.get_stale("a") == (1, True)
+    clock.now += 30
+    assert cache.get_stale("a") == (None, False)  # past the max staleness
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_sqlite_cache_is_shared_and_bounded(tmp_path):
+    from weather_cache import SQLiteTTLCache
+
+    clock = FakeClock()
+    path = str(tmp_path / "cache.sqlite")
+    worker_a = SQLiteTTLCache(path, maxsize=2, ttl=60, stale_ttl=30, clock=clock)
+    worker_b = SQLiteTTLCache(path, maxsize=2, ttl=60, stale_ttl=30, clock=clock)
+
+    worker_a.set(("seattle", "metric"), {"temp": 10.0})
+    assert worker_b.get(("seattle", "metric")) == {"temp": 10.0}
+    clock.now += 1
+    worker_b.set(("tokyo", "metric"), {"temp": 20.0})
+
+    def last_used(city):
+        return worker_a._conn().execute("SELECT last_used FROM cache WHERE key = ?",
+                                        (worker_a._key((city, "metric")),)).fetchone()[0]
+    clock.now += 9
+    touched = clock.now
+    assert worker_a.get(("seattle", "metric")) and last_used("seattle") == touched  # older than ttl/10
+    clock.now += 1
+    assert worker_a.get(("seattle", "metric")) and last_used("seattle") == touched  # recent: no write
+
+    worker_a.set(("paris", "metric"), {"temp": 9.0})
+    assert len(worker_b) == 3                          # over maxsize until the next sweep
+    worker_a.sweep()                                   # evicts the least recently used
+    assert worker_a.get(("tokyo", "metric")) is None
+    assert len(worker_b) == 2 and worker_a.stats()["evictions"] == 1
+
+    clock.now += 70
+    assert worker_b.get_stale(("paris", "metric")) == ({"temp": 9.0}, True)
+    clock.now += 30
+    assert worker_b.get_stale(("paris", "metric")) == (None, False)
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import app as app_module
+
+
+def test_concurrent_misses_share_one_upstream_call(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "OPENWEATHER_KEY", "test-key")
+    app_module._weather_cache.clear()
+    calls = []
+
+    def fake_ow(city, units, api_key):
+        calls.append(city)
+        time.sleep(0.2)
+        return {"city": "Seattle", "units": units, "temp": 10.0, "humidity": 50,
+                "description": "clouds", "wind_speed": 1.0, "ts": "2025-10-07T04:00:00Z"}, 200, None
+
+    monkeypatch.setattr(app_module, "ow_get_weather", fake_ow)
+    before = app_module._weather_flights.stats()["collapsed"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.get("/weather/Seattle?units=metric")))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(rv.status_code == 200 for rv in results)
+    assert app_module._weather_flights.stats()["collapsed"] - before == 4
+    app_module.weather_log_writer().flush()
+
+
+def test_stale_entry_served_while_refreshing(client, monkeypatch):
+    from weather_cache import TTLCache
+
+    monkeypatch.setitem(app_module.app.config, "OPENWEATHER_KEY", "test-key")
+    clock = [1000.0]
+    monkeypatch.setattr(app_module, "CACHE_SWR", True)
+    monkeypatch.setattr(app_module, "_weather_cache", TTLCache(ttl=60, stale_ttl=600, clock=lambda: clock[0]))
+    refreshed = threading.Event()
+
+    def fake_ow(city, units, api_key):
+        refreshed.set()
+        return {"city": "Paris", "units": units, "temp": 21.0, "humidity": 50,
+                "description": "clear", "wind_speed": 1.0, "ts": "2025-10-08T04:00:00Z"}, 200, None
+
+    monkeypatch.setattr(app_module, "ow_get_weather", fake_ow)
+    app_module.cache_set("Paris", "metric", {"city": "Paris", "units": "metric", "temp": 9.0})
+    clock[0] += 120  # expired, but inside the stale window
+
+    data = client.get("/weather/Paris?units=metric").get_json()
+    assert data["temp"] == 9.0 and data["stale"] is True and data["cache"] is True
+    assert refreshed.wait(2)
+    for _ in range(50):
+        if app_module.cache_get("Paris", "metric"):
+            break
+        time.sleep(0.01)
+    assert client.get("/weather/Paris?units=metric").get_json()["temp"] == 21.0
+    app_module.weather_log_writer().flush()
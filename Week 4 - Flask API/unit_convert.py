@@ -0,0 +1,66 @@
+# unit_convert.py
+"""
+Unit conversion for normalized weather payloads.
+Why: we fetch and cache one canonical (metric) payload per city and derive
+imperial/standard locally, instead of one upstream call + cache slot per unit system.
+
+OpenWeather units:
+    metric   → temp °C, wind m/s
+    imperial → temp °F, wind mph
+    standard → temp K,  wind m/s
+"""
+from typing import Any, Dict, Optional
+
+CANONICAL_UNITS = "metric"
+UNITS = ("metric", "imperial", "standard")
+
+MPS_TO_MPH = 2.2369362920544
+
+
+def _temp_to_c(value: float, units: str) -> float:
+    if units == "imperial":
+        return (value - 32) * 5 / 9
+    if units == "standard":
+        return value - 273.15
+    return value
+
+
+def _temp_from_c(value: float, units: str) -> float:
+    if units == "imperial":
+        return value * 9 / 5 + 32
+    if units == "standard":
+        return value + 273.15
+    return value
+
+
+def _wind_to_mps(value: float, units: str) -> float:
+    return value / MPS_TO_MPH if units == "imperial" else value
+
+
+def _wind_from_mps(value: float, units: str) -> float:
+    return value * MPS_TO_MPH if units == "imperial" else value
+
+
+def convert_temp(value: Optional[float], src: str, dst: str) -> Optional[float]:
+    if value is None or src == dst:
+        return value
+    return round(_temp_from_c(_temp_to_c(float(value), src), dst), 2)
+
+
+def convert_wind(value: Optional[float], src: str, dst: str) -> Optional[float]:
+    if value is None or src == dst:
+        return value
+    return round(_wind_from_mps(_wind_to_mps(float(value), src), dst), 2)
+
+
+def to_units(data: Dict[str, Any], units: str) -> Dict[str, Any]:
+    """Return `data` expressed in `units` (a new dict; the input is never mutated)."""
+    src = data.get("units") or CANONICAL_UNITS
+    if src == units:
+        return data
+    return {
+        **data,
+        "units": units,
+        "temp": convert_temp(data.get("temp"), src, units),
+        "wind_speed": convert_wind(data.get("wind_speed"), src, units),
+    }
@@ -0,0 +1,359 @@
+# weather_cache.py
+"""
+Bounded LRU + TTL cache for OpenWeather payloads.
+Why: the old dict only dropped an expired entry when that same key was read,
+so many distinct cities made it grow forever. This one caps the entry count
+(least-recently-used goes first), sweeps expired entries periodically, and
+counts hits/misses/evictions so CACHE_TTL and CACHE_MAX_ENTRIES can be tuned.
+
+With stale_ttl > 0, expired entries are kept for that many extra seconds so
+get_stale() can serve them while the caller refreshes in the background
+(stale-while-revalidate). Past that window they are dropped like before.
+
+SQLiteTTLCache has the same interface but lives in a SQLite file (WAL mode),
+so every gunicorn worker on the host shares one cache and it survives restarts.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300,
+        stale_ttl: float = 0,
+        sweep_interval: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self.stale_ttl = max(0, stale_ttl)
+        self.sweep_interval = ttl if sweep_interval is None else sweep_interval
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()  # key -> (expiry, value)
+        self._lock = threading.Lock()
+        self._last_sweep = clock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0      # dropped to stay under maxsize
+        self.expirations = 0    # dropped because the TTL passed
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return self._lookup(key, allow_stale=False)[0]
+
+    def get_stale(self, key: Hashable) -> Tuple[Optional[Any], bool]:
+        """(value, is_stale): expired entries inside the stale window come back flagged."""
+        return self._lookup(key, allow_stale=True)
+
+    def _lookup(self, key: Hashable, allow_stale: bool) -> Tuple[Optional[Any], bool]:
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            expiry, value = entry
+            if now > expiry + self.stale_ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None, False
+            if now > expiry:
+                # stale: keep it around for get_stale() until the window closes
+                if not allow_stale:
+                    self.misses += 1
+                    return None, False
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                return value, True
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value, False
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Fresh value or None, without touching LRU order or counters."""
+        entry = self._data.get(key)
+        if entry is None or self._clock() > entry[0]:
+            return None
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        now = self._clock()
+        with self._lock:
+            self._data[key] = (now + self.ttl, value)
+            self._data.move_to_end(key)
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def sweep(self) -> int:
+        """Drop every expired entry; returns how many were removed."""
+        with self._lock:
+            return self._sweep(self._clock())
+
+    def _sweep(self, now: float) -> int:
+        expired = [k for k, (expiry, _) in self._data.items() if now > expiry + self.stale_ttl]
+        for k in expired:
+            del self._data[k]
+        self.expirations += len(expired)
+        self._last_sweep = now
+        return len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "backend": "memory",
+                "entries": len(self._data),
+                "max_entries": self.maxsize,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLiteTTLCache:
+    """
+    Disk-backed TTLCache: one row per key in a WAL-mode SQLite file.
+    Each write is a single INSERT OR REPLACE transaction, so readers in other
+    processes see either the old or the new payload, never half of one.
+    LRU order is tracked with a last_used column, approximately: a hit only
+    rewrites it once it is older than TOUCH_FRACTION of the TTL, so hot keys
+    don't turn every read into a write. maxsize is enforced by the periodic
+    sweep (with the expirations), not on every set(), so the table can run
+    a little over it between sweeps. Counters are per process.
+    """
+
+    TOUCH_FRACTION = 0.1
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache (
+        key       TEXT PRIMARY KEY,
+        expires   REAL NOT NULL,
+        last_used REAL NOT NULL,
+        value     TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS cache_last_used ON cache (last_used);
+    """
+
+    def __init__(
+        self,
+        path: str,
+        maxsize: int = 1024,
+        ttl: float = 300,
+        stale_ttl: float = 0,
+        sweep_interval: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = os.path.abspath(path)
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self.stale_ttl = max(0, stale_ttl)
+        self.sweep_interval = ttl if sweep_interval is None else sweep_interval
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()  # guards the counters below
+        self._last_sweep = clock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # one connection per thread (sqlite3 connections are not shared across threads)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return json.dumps(list(key) if isinstance(key, tuple) else key)
+
+    def _count(self, field: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return self._lookup(key, allow_stale=False)[0]
+
+    def get_stale(self, key: Hashable) -> Tuple[Optional[Any], bool]:
+        return self._lookup(key, allow_stale=True)
+
+    def _lookup(self, key: Hashable, allow_stale: bool) -> Tuple[Optional[Any], bool]:
+        now = self._clock()
+        k = self._key(key)
+        conn = self._conn()
+        row = conn.execute("SELECT expires, last_used, value FROM cache WHERE key = ?", (k,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None, False
+        expiry, last_used, raw = row
+        if now > expiry + self.stale_ttl:
+            with conn:
+                conn.execute("DELETE FROM cache WHERE key = ? AND expires = ?", (k, expiry))
+            self._count("expirations")
+            self._count("misses")
+            return None, False
+        stale = now > expiry
+        if stale and not allow_stale:
+            self._count("misses")
+            return None, False
+        if now - last_used > self.ttl * self.TOUCH_FRACTION:
+            with conn:
+                conn.execute("UPDATE cache SET last_used = ? WHERE key = ?", (now, k))
+        self._count("stale_hits" if stale else "hits")
+        return json.loads(raw), stale
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT expires, value FROM cache WHERE key = ?", (self._key(key),)
+        ).fetchone()
+        if row is None or self._clock() > row[0]:
+            return None
+        return json.loads(row[1])
+
+    def set(self, key: Hashable, value: Any) -> None:
+        now = self._clock()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, expires, last_used, value) VALUES (?, ?, ?, ?)",
+                (self._key(key), now + self.ttl, now, json.dumps(value)),
+            )
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(conn, now)
+
+    def sweep(self) -> int:
+        conn = self._conn()
+        with conn:
+            return self._sweep(conn, self._clock())
+
+    def _sweep(self, conn: sqlite3.Connection, now: float) -> int:
+        """Drop expired rows, then the least recently used ones over maxsize."""
+        n = conn.execute("DELETE FROM cache WHERE expires + ? < ?", (self.stale_ttl, now)).rowcount
+        self._count("expirations", n)
+        over = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.maxsize
+        if over > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_used LIMIT ?)",
+                (over,),
+            )
+            self._count("evictions", over)
+        self._last_sweep = now
+        return n
+
+    def clear(self) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM cache")
+
+    def stats(self) -> Dict[str, Any]:
+        entries = len(self)
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "backend": "sqlite",
+                "entries": entries,
+                "max_entries": self.maxsize,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Per-key request coalescing: the first caller for a key runs fn(),
+    everyone who arrives while it is in flight waits for that same result.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0   # calls that actually ran fn()
+        self.collapsed = 0  # callers that piggybacked on someone else's call
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, shared); shared is True if we waited on another caller."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.collapsed += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as ex:
+            call.error = ex
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "collapsed": self.collapsed,
+                "in_flight": len(self._calls),
+            }